@@ -0,0 +1,297 @@
+"""
+Benchmarks of the client library's hot paths, run offline against the fake controller.
+
+    python benchmarks/benchmark.py --output results.json
+
+Results are written as JSON, so that runs against different versions can be compared.
+"""
+
+import argparse
+import asyncio
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+import json
+import os
+from pathlib import Path
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Awaitable, Callable, Iterator
+
+# Benchmark the source tree, rather than whatever version happens to be installed
+_SRC = Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(_SRC))
+
+# pylint: disable=wrong-import-position
+from tplink_omada_client import OmadaClient, SwitchPortSettings  # noqa: E402
+from tplink_omada_client.clients import OmadaWirelessClient  # noqa: E402
+from tplink_omada_client.devices import OmadaSwitchPortDetails  # noqa: E402
+from tplink_omada_client.testing import (  # noqa: E402
+    FakeOmadaController,
+    SiteSpec,
+    generate_site,
+)
+
+
+@dataclass
+class BenchmarkResult:
+    """Timings of one benchmark, in seconds."""
+
+    name: str
+    repeat: int
+    min: float
+    median: float
+    mean: float
+    max: float
+    # Controller requests made by one run, by method and endpoint
+    requests: dict[str, int] = field(default_factory=dict)
+
+
+def _summarize(name: str, timings: list[float], requests: dict[str, int]) -> BenchmarkResult:
+    return BenchmarkResult(
+        name,
+        len(timings),
+        min(timings),
+        statistics.median(timings),
+        statistics.mean(timings),
+        max(timings),
+        requests,
+    )
+
+
+async def _time_client_operation(
+    name: str,
+    spec: SiteSpec,
+    repeat: int,
+    operation: Callable[[OmadaClient], Awaitable[Any]],
+) -> BenchmarkResult:
+    """Time an operation against a fresh fake controller, excluding the login."""
+    async with FakeOmadaController([spec]) as controller:
+        async with OmadaClient(controller.url, controller.username, controller.password) as client:
+            await client.login()
+            timings = []
+            for _ in range(repeat):
+                controller.reset_counts()
+                started = time.perf_counter()
+                await operation(client)
+                timings.append(time.perf_counter() - started)
+            return _summarize(name, timings, dict(controller.request_counts))
+
+
+async def _page_clients(client: OmadaClient, concurrency: int) -> None:
+    site_client = await client.get_site_client("Default")
+    async for _ in site_client.get_connected_clients(page_size=1000, concurrency=concurrency):
+        pass
+
+
+async def _get_switches(client: OmadaClient) -> None:
+    site_client = await client.get_site_client("Default")
+    await site_client.get_switches()
+
+
+async def _get_access_points(client: OmadaClient) -> None:
+    site_client = await client.get_site_client("Default")
+    await site_client.get_access_points()
+
+
+async def _update_switch_port(client: OmadaClient) -> None:
+    site_client = await client.get_site_client("Default")
+    devices = await site_client.get_devices()
+    switch = next(d for d in devices if d.type == "switch")
+    await site_client.update_switch_port(
+        switch,
+        5,
+        SwitchPortSettings(name="Camera", profile_override_enabled=True),
+    )
+
+
+async def _update_switch_ports(client: OmadaClient) -> None:
+    site_client = await client.get_site_client("Default")
+    devices = await site_client.get_devices()
+    switch = next(d for d in devices if d.type == "switch")
+    await site_client.update_switch_ports(
+        switch,
+        {
+            port: SwitchPortSettings(name=f"Port {port}", profile_override_enabled=True)
+            for port in range(1, 25)
+        },
+    )
+
+
+def _time_models(name: str, repeat: int, build: Callable[[], None]) -> BenchmarkResult:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        build()
+        timings.append(time.perf_counter() - started)
+    return _summarize(name, timings, {})
+
+
+def _read_properties(model: Any) -> None:
+    for name in dir(type(model)):
+        if isinstance(getattr(type(model), name, None), property):
+            try:
+                getattr(model, name)
+            except (KeyError, ValueError):
+                # Not every property is present in every response
+                pass
+
+
+def _wireless_client_models(rows: list[dict[str, Any]]) -> Callable[[], None]:
+    def build() -> None:
+        for row in rows:
+            _read_properties(OmadaWirelessClient(row))
+
+    return build
+
+
+def _switch_port_models(rows: list[dict[str, Any]]) -> Callable[[], None]:
+    def build() -> None:
+        for row in rows:
+            _read_properties(OmadaSwitchPortDetails(row))
+
+    return build
+
+
+@contextmanager
+def _controller_in_thread(spec: SiteSpec) -> Iterator[FakeOmadaController]:
+    """Run a fake controller on its own event loop, so that a separate process can use it."""
+    controller = FakeOmadaController([spec])
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(controller.start(), loop).result()
+    try:
+        yield controller
+    finally:
+        asyncio.run_coroutine_threadsafe(controller.stop(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+def _time_cli(name: str, spec: SiteSpec, repeat: int, command: list[str]) -> BenchmarkResult:
+    """Time a CLI command end to end, including interpreter startup and imports."""
+    with _controller_in_thread(spec) as controller, tempfile.TemporaryDirectory() as home:
+        # The CLI reads its targets from ~/.omada.cfg
+        Path(home, ".omada.cfg").write_text(
+            "[controller:bench]\n"
+            f"url = {controller.url}\n"
+            f"username = {controller.username}\n"
+            f"password = {controller.password}\n"
+            "site = Default\n"
+            "verify_ssl = False\n",
+            encoding="utf-8",
+        )
+        env = {**os.environ, "HOME": home, "PYTHONPATH": str(_SRC)}
+        timings = []
+        for _ in range(repeat):
+            controller.reset_counts()
+            started = time.perf_counter()
+            subprocess.run(
+                [sys.executable, "-m", "tplink_omada_client.cli", "-t", "bench", *command],
+                env=env,
+                check=True,
+                stdout=subprocess.DEVNULL,
+            )
+            timings.append(time.perf_counter() - started)
+        return _summarize(name, timings, dict(controller.request_counts))
+
+
+async def run_benchmarks(repeat: int, quick: bool) -> list[BenchmarkResult]:
+    """Run all the benchmarks. Quick runs use smaller sites."""
+    scale = 10 if quick else 1
+    large_site = SiteSpec(switches=50 // scale, access_points=400 // scale, clients=1000)
+    results = []
+
+    for clients in (10_000 // scale, 50_000 // scale):
+        spec = SiteSpec(switches=2, access_points=20, clients=clients, disconnected_clients=0)
+        for concurrency in (1, 8):
+            results.append(
+                await _time_client_operation(
+                    f"page_clients[{clients},concurrency={concurrency}]",
+                    spec,
+                    repeat,
+                    lambda client, c=concurrency: _page_clients(client, c),
+                )
+            )
+
+    results.append(
+        await _time_client_operation(
+            f"get_switches[{large_site.switches}]", large_site, repeat, _get_switches
+        )
+    )
+    results.append(
+        await _time_client_operation(
+            f"get_access_points[{large_site.access_points}]", large_site, repeat, _get_access_points
+        )
+    )
+    results.append(
+        await _time_client_operation("update_switch_port", SiteSpec(), repeat, _update_switch_port)
+    )
+    results.append(
+        await _time_client_operation("update_switch_ports[24]", SiteSpec(), repeat, _update_switch_ports)
+    )
+
+    site = generate_site(SiteSpec(switches=40, access_points=50, clients=10_000 // scale), 0)
+    wireless_rows = [c for c in site.clients.values() if c["wireless"]]
+    results.append(
+        _time_models(
+            f"model_wireless_client[{len(wireless_rows)}]", repeat, _wireless_client_models(wireless_rows)
+        )
+    )
+    port_rows = [port for ports in site.switch_ports.values() for port in ports.values()]
+    results.append(
+        _time_models(f"model_switch_port_details[{len(port_rows)}]", repeat, _switch_port_models(port_rows))
+    )
+
+    results.append(_time_cli("cli_switches", large_site, repeat, ["switches"]))
+    results.append(_time_cli("cli_clients", large_site, repeat, ["clients"]))
+
+    return results
+
+
+def _package_version() -> str:
+    with open(_SRC.parent / "pyproject.toml", encoding="utf-8") as file:
+        for line in file:
+            if line.startswith("version"):
+                return line.split("=", 1)[1].strip().strip('"')
+    return "unknown"
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run the benchmarks, print a summary and write the results as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-o", "--output", help="File to write JSON results to", default="benchmark_results.json")
+    parser.add_argument("-r", "--repeat", help="Number of times to run each benchmark", type=int, default=5)
+    parser.add_argument("-q", "--quick", help="Use smaller sites, for a fast smoke run", action="store_true")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run_benchmarks(args.repeat, args.quick))
+
+    for result in results:
+        print(
+            f"{result.name:45} median {result.median * 1000:9.2f}ms  "
+            f"min {result.min * 1000:9.2f}ms  requests {sum(result.requests.values())}"
+        )
+
+    report = {
+        "version": _package_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "quick": args.quick,
+        "results": [asdict(r) for r in results],
+    }
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,26 @@
 """TP-Link Omada API Client"""
 
 from .devices import OmadaSwitchPortDetails
+from .budget import CallBudget, call_budget
+from .circuitbreaker import CircuitBreaker, CircuitState
+from .hedging import RequestHedger
+from .instrumentation import (
+    ConnectionEvent,
+    LatencyHistogram,
+    RequestInstrumentation,
+    RequestRecord,
+)
+from .limiter import AdaptiveConcurrencyLimiter
+from .deadline import deadline
+from .deviceregistry import DeviceRegistry
+from .portprofiles import PortProfileIndex
+from .omadaapiconnection import (
+    ConnectionPoolSettings,
+    RequestTimeouts,
+    RetryPolicy,
+)
 from .omadaclient import OmadaClient, OmadaSite
+from .responsecache import CacheStats, OmadaResponseCache
 from .omadasiteclient import (
     AccessPointPortSettings,
     GatewayPortSettings,
@@ -18,7 +37,23 @@ from . import clients
 __all__ = [
     "OmadaClient",
     "OmadaSite",
+    "ConnectionPoolSettings",
+    "RetryPolicy",
+    "AdaptiveConcurrencyLimiter",
+    "RequestTimeouts",
+    "deadline",
+    "RequestHedger",
+    "CircuitBreaker",
+    "CircuitState",
+    "RequestInstrumentation",
+    "RequestRecord",
+    "ConnectionEvent",
+    "LatencyHistogram",
+    "CallBudget",
+    "call_budget",
     "OmadaSiteClient",
+    "DeviceRegistry",
+    "PortProfileIndex",
     "AccessPointPortSettings",
     "GatewayPortSettings",
     "OmadaClientSettings",
@@ -26,6 +61,8 @@ __all__ = [
     "PortProfileOverrides",
     "SwitchPortSettings",
     "OmadaSwitchPortDetails",
+    "OmadaResponseCache",
+    "CacheStats",
     "definitions",
     "exceptions",
     "clients",
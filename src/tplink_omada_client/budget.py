@@ -0,0 +1,70 @@
+"""Accounting of the requests made by high-level operations."""
+
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+import time
+from typing import AsyncIterator
+
+from .instrumentation import RequestRecord
+
+_active_budgets: ContextVar[tuple["CallBudget", ...]] = ContextVar(
+    "omada_call_budgets", default=()
+)
+
+
+@dataclass
+class CallBudget:
+    """The requests made to the controller within a `call_budget()` block."""
+
+    requests: int = 0
+    errors: int = 0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    # Total time spent in requests. Concurrent requests can make this longer than the elapsed time.
+    request_time: float = 0
+    # Wall clock time of the block, set when it exits
+    elapsed: float = 0
+    records: list[RequestRecord] = field(default_factory=list, repr=False)
+
+    @property
+    def endpoints(self) -> list[str]:
+        """The method and normalized endpoint of each request, in the order they finished."""
+        return [f"{r.method} {r.endpoint}" for r in self.records]
+
+    def add(self, record: RequestRecord) -> None:
+        """Count a finished request."""
+        self.requests += 1
+        if record.error is not None:
+            self.errors += 1
+        self.bytes_sent += record.bytes_sent
+        self.bytes_received += record.bytes_received
+        self.request_time += record.total_time
+        self.records.append(record)
+
+
+def active_budgets() -> tuple[CallBudget, ...]:
+    """The call budgets that requests made now should be counted in."""
+    return _active_budgets.get()
+
+
+@asynccontextmanager
+async def call_budget() -> AsyncIterator[CallBudget]:
+    """
+    Count the requests, bytes and time spent in everything called within the block.
+
+    Requests made by tasks started within the block are included, and nested blocks count
+    towards their outer blocks too.
+
+        async with call_budget() as budget:
+            await site_client.update_switch_port(mac, 5, settings)
+        assert budget.requests <= 4
+    """
+    budget = CallBudget()
+    token = _active_budgets.set(_active_budgets.get() + (budget,))
+    started = time.perf_counter()
+    try:
+        yield budget
+    finally:
+        budget.elapsed = time.perf_counter() - started
+        _active_budgets.reset(token)
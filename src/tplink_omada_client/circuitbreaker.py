@@ -0,0 +1,128 @@
+"""Circuit breaker, to fail fast while a controller is unhealthy."""
+
+import asyncio
+from enum import Enum
+import time
+from typing import Any, Awaitable, Callable, TypeVar
+
+from .exceptions import ControllerUnavailable, DeadlineExceeded, is_transient_error
+
+_T = TypeVar("_T")
+
+
+class CircuitState(Enum):
+    """States of the circuit breaker."""
+
+    # Requests are sent to the controller
+    CLOSED = "closed"
+    # Requests are rejected without contacting the controller
+    OPEN = "open"
+    # A probe request is checking whether the controller has recovered
+    HALF_OPEN = "half_open"
+
+
+StateChangeCallback = Callable[[CircuitState, CircuitState], None]
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests to a controller that keeps failing.
+
+    After `failure_threshold` consecutive connection failures or 5xx errors, the circuit opens and requests
+    fail immediately with ControllerUnavailable. After `reset_timeout` seconds, the next request first
+    sends a single probe to the controller. If the probe succeeds the circuit closes, otherwise it opens
+    again for another `reset_timeout`.
+
+    Callbacks registered with `add_listener` are called with the old and new state on every change.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30,
+        on_state_change: StateChangeCallback | None = None,
+    ):
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._listeners: list[StateChangeCallback] = []
+        if on_state_change is not None:
+            self._listeners.append(on_state_change)
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+
+    @property
+    def state(self) -> CircuitState:
+        """The current state of the circuit."""
+        return self._state
+
+    def add_listener(self, callback: StateChangeCallback) -> Callable[[], None]:
+        """Register a callback for state changes. Returns a function that unregisters it."""
+        self._listeners.append(callback)
+        return lambda: self._listeners.remove(callback)
+
+    async def call(
+        self, send: Callable[[], Awaitable[_T]], probe: Callable[[], Awaitable[Any]]
+    ) -> _T:
+        """Send a request through the breaker, probing the controller first if it is recovering."""
+        await self._before_request(probe)
+        try:
+            result = await send()
+        except DeadlineExceeded:
+            # The caller ran out of time, which says nothing about the controller
+            raise
+        except Exception as err:
+            if is_transient_error(err):
+                self._record_failure()
+            else:
+                # The controller answered, even if it didn't like the request
+                self._record_success()
+            raise
+        self._record_success()
+        return result
+
+    async def _before_request(self, probe: Callable[[], Awaitable[Any]]) -> None:
+        if self._state == CircuitState.CLOSED:
+            return
+        if (
+            self._state == CircuitState.HALF_OPEN
+            or time.monotonic() - self._opened_at < self._reset_timeout
+        ):
+            raise ControllerUnavailable("Omada controller is unavailable")
+
+        # This request gets to probe the controller, while the others keep failing fast
+        self._set_state(CircuitState.HALF_OPEN)
+        try:
+            await probe()
+        except asyncio.CancelledError:
+            # The probe never got an answer, so let the next request probe straight away
+            self._set_state(CircuitState.OPEN)
+            raise
+        except Exception as err:
+            self._open()
+            raise ControllerUnavailable("Omada controller is unavailable") from err
+        self._failures = 0
+        self._set_state(CircuitState.CLOSED)
+
+    def _record_success(self) -> None:
+        self._failures = 0
+
+    def _record_failure(self) -> None:
+        self._failures += 1
+        if (
+            self._state == CircuitState.CLOSED
+            and self._failures >= self._failure_threshold
+        ):
+            self._open()
+
+    def _open(self) -> None:
+        self._opened_at = time.monotonic()
+        self._set_state(CircuitState.OPEN)
+
+    def _set_state(self, state: CircuitState) -> None:
+        old_state = self._state
+        if old_state == state:
+            return
+        self._state = state
+        for listener in list(self._listeners):
+            listener(old_state, state)
@@ -7,6 +7,7 @@ from typing import Any
 from re import IGNORECASE, match
 from tplink_omada_client.devices import OmadaApiData, OmadaDevice
 from tplink_omada_client.definitions import LinkStatus
+from tplink_omada_client.exceptions import InvalidDevice
 from tplink_omada_client import OmadaSiteClient
 
 TARGET_ARG: str = "target"
@@ -40,18 +41,15 @@ async def get_device_mac(site_client: OmadaSiteClient, mac_or_name: str) -> str:
     if match("([0-9A-F]{2}[-]){5}[0-9A-F]{2}$", string=mac_or_name, flags=IGNORECASE):
         return mac_or_name
 
-    device = next((d for d in await site_client.get_devices() if d.name == mac_or_name), None)
-    if not device:
-        raise argparse.ArgumentError(None, f"Device with name {mac_or_name} not found")
-    return device.mac
+    return (await get_device_by_mac_or_name(site_client, mac_or_name)).mac
 
 
 async def get_device_by_mac_or_name(site_client: OmadaSiteClient, mac_or_name: str) -> OmadaDevice:
     """Get an Omada device given the MAC or name of the device."""
-    device = next((d for d in await site_client.get_devices() if mac_or_name in (d.name, d.mac)), None)
-    if not device:
-        raise argparse.ArgumentError(None, f"Device with name {mac_or_name} not found")
-    return device
+    try:
+        return await site_client.find_device(mac_or_name)
+    except InvalidDevice:
+        raise argparse.ArgumentError(None, f"Device with name {mac_or_name} not found") from None
 
 
 def dump_raw_data(args: dict[str, Any], data: OmadaApiData):
@@ -0,0 +1,58 @@
+"""Time budgets for operations that make several requests to the controller."""
+
+import asyncio
+from contextlib import asynccontextmanager
+from contextvars import Context, ContextVar, copy_context
+import time
+from typing import AsyncIterator
+
+from .exceptions import DeadlineExceeded
+
+_deadline: ContextVar[float | None] = ContextVar("omada_deadline", default=None)
+
+
+def remaining_time() -> float | None:
+    """Seconds left before the current deadline, or None if there is no deadline."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def context_without_deadline() -> Context:
+    """
+    A copy of the current context with no deadline, for work shared by callers with different deadlines.
+    """
+    context = copy_context()
+    context.run(_deadline.set, None)
+    return context
+
+
+@asynccontextmanager
+async def deadline(seconds: float) -> AsyncIterator[None]:
+    """
+    Limit the time a whole operation can take, across all of the requests it makes.
+
+    Each request is given at most the time remaining, and the operation is cancelled with a
+    DeadlineExceeded error if it overruns. Nested deadlines can only shorten the time available.
+
+        async with deadline(10):
+            await site_client.update_switch_port(mac, 5, settings)
+    """
+    expires = time.monotonic() + seconds
+    outer = _deadline.get()
+    if outer is not None:
+        expires = min(expires, outer)
+
+    token = _deadline.set(expires)
+    timeout = asyncio.timeout(expires - time.monotonic())
+    try:
+        async with timeout:
+            yield
+    except TimeoutError as err:
+        if not timeout.expired():
+            # Not ours to convert
+            raise
+        raise DeadlineExceeded("Operation deadline exceeded") from err
+    finally:
+        _deadline.reset(token)
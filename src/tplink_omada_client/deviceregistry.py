@@ -0,0 +1,100 @@
+"""Index of a site's devices, for resolving devices without scanning the device list."""
+
+import re
+from typing import Awaitable, Callable
+
+from .devices import OmadaListDevice
+from .exceptions import InvalidDevice
+from .snapshot import RefreshableSnapshot
+
+_MAC_PATTERN = re.compile(r"^[0-9A-Fa-f]{2}([-:]?)(?:[0-9A-Fa-f]{2}\1){4}[0-9A-Fa-f]{2}$")
+
+
+def is_mac_address(value: str) -> bool:
+    """True if the value looks like a MAC address, with or without separators."""
+    return _MAC_PATTERN.match(value) is not None
+
+
+def normalize_mac(mac: str) -> str:
+    """Convert a MAC address to the controller's format, such as 'AA-BB-CC-DD-EE-FF'."""
+    digits = re.sub(r"[^0-9A-Fa-f]", "", mac).upper()
+    if len(digits) != 12:
+        return mac.upper()
+    return "-".join(digits[i : i + 2] for i in range(0, 12, 2))
+
+
+class DeviceRegistry(RefreshableSnapshot[list[OmadaListDevice]]):
+    """
+    The devices of a site, indexed by MAC address, name and type.
+
+    The registry is updated whenever the device list is downloaded, and downloads it again when it is
+    older than `max_age` seconds, or a device can't be found. Entries for unchanged devices are kept
+    between updates, so only changed devices are re-indexed.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], Awaitable[list[OmadaListDevice]]],
+        max_age: float = 30,
+    ):
+        super().__init__(fetch, max_age)
+        self._by_mac: dict[str, OmadaListDevice] = {}
+        self._by_name: dict[str, OmadaListDevice] = {}
+        self._by_type: dict[str, dict[str, OmadaListDevice]] = {}
+
+    @property
+    def devices(self) -> list[OmadaListDevice]:
+        """All the devices currently known, without refreshing."""
+        return list(self._by_mac.values())
+
+    def _store(self, data: list[OmadaListDevice]) -> None:
+        seen = set()
+        for device in data:
+            mac = normalize_mac(device.mac)
+            seen.add(mac)
+            existing = self._by_mac.get(mac)
+            if existing is not None and existing.raw_data == device.raw_data:
+                continue
+            if existing is not None:
+                self._unindex(mac, existing)
+            self._by_mac[mac] = device
+            self._by_name[device.name] = device
+            self._by_type.setdefault(device.type, {})[mac] = device
+
+        for mac in [m for m in self._by_mac if m not in seen]:
+            self._unindex(mac, self._by_mac.pop(mac))
+
+    async def get(self, mac: str) -> OmadaListDevice:
+        """Get a device by MAC address."""
+        return await self._lookup(lambda: self._by_mac.get(normalize_mac(mac)), mac)
+
+    async def find(self, mac_or_name: str) -> OmadaListDevice:
+        """Get a device by MAC address or name."""
+        if is_mac_address(mac_or_name):
+            return await self.get(mac_or_name)
+        return await self._lookup(lambda: self._by_name.get(mac_or_name), mac_or_name)
+
+    async def of_type(self, device_type: str) -> list[OmadaListDevice]:
+        """Get the devices of a type, such as 'gateway'."""
+        if self.is_stale:
+            await self.refresh()
+        return list(self._by_type.get(device_type, {}).values())
+
+    async def _lookup(
+        self, find: Callable[[], OmadaListDevice | None], key: str
+    ) -> OmadaListDevice:
+        device = None if self.is_stale else find()
+        if device is None:
+            # The device may be new, or renamed, since we last looked
+            await self.refresh()
+            device = find()
+        if device is None:
+            raise InvalidDevice(f"Device {key} not found")
+        return device
+
+    def _unindex(self, mac: str, device: OmadaListDevice) -> None:
+        if self._by_name.get(device.name) is device:
+            del self._by_name[device.name]
+        devices_of_type = self._by_type.get(device.type)
+        if devices_of_type is not None:
+            devices_of_type.pop(mac, None)
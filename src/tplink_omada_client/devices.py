@@ -51,7 +51,7 @@ class OmadaDevice(OmadaApiData):
     @property
     def model(self) -> str:
         """The device model, such as EAP225."""
-        return self._data("model", "Unknown")
+        return self._data.get("model", "Unknown")
 
     @property
     def model_display_name(self) -> str:
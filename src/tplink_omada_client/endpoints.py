@@ -0,0 +1,63 @@
+"""Helpers for classifying controller API urls by endpoint."""
+
+import re
+from typing import TypeVar
+from urllib.parse import urlsplit
+
+_ENDPOINT_PATTERN = re.compile(
+    r"/(?:[^/]+/api/v2|openapi/v1/[^/]+)/(?:sites/(?P<site>[^/]+)/)?(?P<endpoint>.*)$"
+)
+
+_MAC_PATTERN = re.compile(r"^[0-9A-Fa-f]{2}([-:][0-9A-Fa-f]{2}){5}$")
+# Object IDs are 24 digit hex strings, but also match UUIDs and other long hex tokens
+_ID_PATTERN = re.compile(r"^(?=.*[0-9])[0-9A-Fa-f-]{16,}$")
+
+_T = TypeVar("_T")
+
+
+def parse_endpoint(url: str) -> tuple[str | None, str]:
+    """Split a controller API url into its site and the site-relative endpoint."""
+    path = urlsplit(url).path
+    match = _ENDPOINT_PATTERN.search(path)
+    if match is None:
+        return (None, path.lstrip("/"))
+    return (match["site"], match["endpoint"])
+
+
+def endpoint_template(url: str) -> str:
+    """
+    Get a normalized form of a controller API url's endpoint, for grouping statistics.
+
+    The site, MAC addresses, object IDs and numbers are replaced with placeholders,
+    so 'sites/abc/switches/AA-BB-CC-DD-EE-FF/ports/3' becomes 'switches/{mac}/ports/{n}'.
+    """
+    _, endpoint = parse_endpoint(url)
+    segments = []
+    for segment in endpoint.split("/"):
+        if _MAC_PATTERN.match(segment):
+            segment = "{mac}"
+        elif segment.isdigit():
+            segment = "{n}"
+        elif _ID_PATTERN.match(segment):
+            segment = "{id}"
+        segments.append(segment)
+    return "/".join(segments)
+
+
+def match_endpoint_policy(
+    policy: dict[str, _T], endpoint: str, default: _T
+) -> _T:
+    """
+    Find the policy value for an endpoint.
+
+    Policy keys are endpoint prefixes, which match the endpoint itself and any endpoint below it.
+    The longest matching prefix wins.
+    """
+    best_match: str | None = None
+    value = default
+    for prefix, prefix_value in policy.items():
+        if endpoint == prefix or endpoint.startswith(prefix + "/"):
+            if best_match is None or len(prefix) > len(best_match):
+                best_match = prefix
+                value = prefix_value
+    return value
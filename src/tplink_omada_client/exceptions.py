@@ -1,5 +1,7 @@
 """Exceptions that the library might throw."""
 
+from typing import Any
+
 
 class OmadaClientException(Exception):
     """Base for all exceptions raised by the library."""
@@ -13,6 +15,16 @@ class RequestFailed(OmadaClientException):
         self._msg = msg
         super().__init__(f"Omada controller responded '{msg}' ({error_code})")
 
+    @property
+    def error_code(self) -> int:
+        """The error code returned by the controller, or HTTP status code."""
+        return self._error_code
+
+    @property
+    def msg(self) -> str:
+        """The error message returned by the controller."""
+        return self._msg
+
 
 class LoginFailed(RequestFailed):
     """Username/Password failure."""
@@ -47,9 +59,87 @@ class ConnectionFailed(OmadaClientException):
     """Connection to Omada controller failed at the network level."""
 
 
+class RequestTimeout(ConnectionFailed):
+    """A request timed out before the controller responded."""
+
+
+class DeadlineExceeded(OmadaClientException):
+    """
+    An operation ran out of the time given to it by `deadline()`.
+
+    This is the caller's own limit rather than a problem with the controller, so it isn't retried.
+    """
+
+
 class BadControllerUrl(OmadaClientException):
     """URL of controller could not be resolved."""
 
 
 class InvalidDevice(OmadaClientException):
     """Device type isn't valid for this operation."""
+
+
+class DeviceDetailsFailed(OmadaClientException):
+    """
+    Details of some devices in a list could not be fetched.
+
+    The details of every other device were still fetched, and are available from `results`.
+    """
+
+    def __init__(self, results: list, errors: dict[str, OmadaClientException]):
+        self._results = results
+        self._errors = errors
+        super().__init__(
+            f"Failed to get details of {len(errors)} device(s): {', '.join(errors)}"
+        )
+
+    @property
+    def results(self) -> list:
+        """The details of the devices that were fetched successfully."""
+        return self._results
+
+    @property
+    def errors(self) -> dict[str, OmadaClientException]:
+        """The error for each device that failed, by MAC address."""
+        return self._errors
+
+
+class PortUpdatesFailed(OmadaClientException):
+    """
+    Some of the ports in a bulk update could not be updated.
+
+    Every other update was still made, and the updated ports or access points are available from
+    `results`.
+    """
+
+    def __init__(self, results: list, errors: dict[Any, OmadaClientException]):
+        self._results = results
+        self._errors = errors
+        super().__init__(
+            f"Port updates failed for {len(errors)} target(s): {', '.join(str(key) for key in errors)}"
+        )
+
+    @property
+    def results(self) -> list:
+        """The new details of the ports, or access points, that were updated successfully."""
+        return self._results
+
+    @property
+    def errors(self) -> dict[Any, OmadaClientException]:
+        """The error for each update that failed, by port, or by MAC address for access points."""
+        return self._errors
+
+
+class ControllerUnavailable(OmadaClientException):
+    """
+    The controller has been failing, so requests are being rejected without contacting it.
+
+    Requests resume once a probe of the controller succeeds.
+    """
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """True if a request failed in a way that might succeed if tried again later."""
+    if isinstance(error, ConnectionFailed):
+        return True
+    return isinstance(error, RequestFailed) and 500 <= error.error_code < 600
@@ -0,0 +1,14 @@
+"""Prometheus metrics exporter for Omada controllers, and for the client library itself."""
+
+from .collector import collect_library_metrics, collect_site_metrics
+from .metrics import CONTENT_TYPE, MetricFamily, render_metrics
+from .server import OmadaExporter
+
+__all__ = [
+    "OmadaExporter",
+    "MetricFamily",
+    "render_metrics",
+    "collect_library_metrics",
+    "collect_site_metrics",
+    "CONTENT_TYPE",
+]
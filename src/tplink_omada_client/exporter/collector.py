@@ -0,0 +1,150 @@
+"""Collection of library and site metrics."""
+
+from ..definitions import DeviceStatusCategory, LinkStatus
+from ..clients import OmadaWirelessClient
+from ..exceptions import DeviceDetailsFailed
+from ..instrumentation import RequestInstrumentation
+from ..omadasiteclient import OmadaSiteClient
+from .metrics import MetricFamily
+
+
+def collect_library_metrics(
+    instrumentation: RequestInstrumentation,
+) -> list[MetricFamily]:
+    """Metrics about the requests this library has made to the controller. No requests are made."""
+    latency = MetricFamily(
+        "omada_client_request_duration_seconds",
+        "Latency of requests to the controller.",
+        "histogram",
+    )
+    for (method, endpoint), histogram in sorted(instrumentation.histograms.items()):
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            latency.add(
+                cumulative, "_bucket", method=method, endpoint=endpoint, le=bound
+            )
+        latency.add(
+            histogram.count, "_bucket", method=method, endpoint=endpoint, le="+Inf"
+        )
+        latency.add(histogram.sum, "_sum", method=method, endpoint=endpoint)
+        latency.add(histogram.count, "_count", method=method, endpoint=endpoint)
+
+    errors = MetricFamily(
+        "omada_client_request_errors_total",
+        "Requests to the controller that failed.",
+        "counter",
+    )
+    for (method, endpoint), count in sorted(instrumentation.errors.items()):
+        errors.add(count, method=method, endpoint=endpoint)
+
+    events = MetricFamily(
+        "omada_client_connection_events_total",
+        "Logins, expired sessions and retries.",
+        "counter",
+    )
+    for kind, count in sorted(instrumentation.event_counts.items()):
+        events.add(count, kind=kind)
+
+    return [latency, errors, events]
+
+
+async def collect_site_metrics(
+    site_client: OmadaSiteClient, site: str
+) -> list[MetricFamily]:
+    """Fetch the devices, switch ports and clients of a site from the controller, as metrics."""
+    device_up = MetricFamily(
+        "omada_device_up", "1 if the device is connected to the controller."
+    )
+    cpu = MetricFamily(
+        "omada_device_cpu_usage_percent", "CPU usage of the device."
+    )
+    memory = MetricFamily(
+        "omada_device_memory_usage_percent", "Memory usage of the device."
+    )
+    uptime = MetricFamily("omada_device_uptime_seconds", "Uptime of the device.")
+
+    devices = await site_client.get_devices()
+    for device in devices:
+        labels = {
+            "site": site,
+            "mac": device.mac,
+            "name": device.name,
+            "type": device.type,
+            "model": device.model,
+        }
+        connected = device.status_category == DeviceStatusCategory.CONNECTED
+        device_up.add(1 if connected else 0, **labels)
+        if connected:
+            cpu.add(device.cpu_usage, **labels)
+            memory.add(device.mem_usage, **labels)
+            uptime.add(device.uptime, **labels)
+
+    port_up = MetricFamily(
+        "omada_switch_port_link_up", "1 if the switch port has a link."
+    )
+    port_tx = MetricFamily(
+        "omada_switch_port_transmit_bytes_total",
+        "Bytes transmitted by the switch port.",
+        "counter",
+    )
+    port_rx = MetricFamily(
+        "omada_switch_port_receive_bytes_total",
+        "Bytes received by the switch port.",
+        "counter",
+    )
+    poe_power = MetricFamily(
+        "omada_switch_port_poe_power_watts", "Power supplied by the switch port."
+    )
+    try:
+        switches = await site_client.get_switches()
+    except DeviceDetailsFailed as err:
+        # Export the switches we could get
+        switches = err.results
+    for switch in switches:
+        if switch.status_category != DeviceStatusCategory.CONNECTED:
+            continue
+        for port in switch.ports:
+            labels = {
+                "site": site,
+                "switch_mac": switch.mac,
+                "switch_name": switch.name,
+                "port": port.port,
+                "port_name": port.name,
+            }
+            status = port.port_status
+            port_up.add(1 if status.link_status == LinkStatus.LINK_UP else 0, **labels)
+            port_tx.add(status.bytes_tx, **labels)
+            port_rx.add(status.bytes_rx, **labels)
+            if status.poe_power is not None:
+                poe_power.add(status.poe_power, **labels)
+
+    wireless_counts: dict[tuple[str, str, str], int] = {}
+    wired_count = 0
+    async for client in site_client.get_connected_clients():
+        if isinstance(client, OmadaWirelessClient):
+            key = (client.ssid, client.ap_mac, client.ap_name)
+            wireless_counts[key] = wireless_counts.get(key, 0) + 1
+        else:
+            wired_count += 1
+
+    wireless_clients = MetricFamily(
+        "omada_wireless_clients", "Wireless clients connected, by SSID and access point."
+    )
+    for (ssid, ap_mac, ap_name), count in sorted(wireless_counts.items()):
+        wireless_clients.add(count, site=site, ssid=ssid, ap_mac=ap_mac, ap_name=ap_name)
+    wired_clients = MetricFamily("omada_wired_clients", "Wired clients connected.")
+    wired_clients.add(wired_count, site=site)
+
+    return [
+        device_up,
+        cpu,
+        memory,
+        uptime,
+        port_up,
+        port_tx,
+        port_rx,
+        poe_power,
+        wireless_clients,
+        wired_clients,
+    ]
@@ -0,0 +1,64 @@
+"""Metric families, and the Prometheus text exposition format."""
+
+import math
+from typing import Iterable
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricFamily:
+    """A named metric, with one sample for each combination of label values."""
+
+    def __init__(self, name: str, documentation: str, metric_type: str = "gauge"):
+        self.name = name
+        self.documentation = documentation
+        self.type = metric_type
+        # Sample name suffix, labels and value
+        self.samples: list[tuple[str, dict[str, str], float]] = []
+
+    def add(self, value: float, suffix: str = "", **labels: object) -> None:
+        """Add a sample. `suffix` is appended to the name, for histogram _bucket, _sum and _count samples."""
+        self.samples.append(
+            (suffix, {k: str(v) for k, v in labels.items()}, float(value))
+        )
+
+    def render(self) -> str:
+        """Render the family in the Prometheus text format."""
+        lines = [
+            f"# HELP {self.name} {_escape_help(self.documentation)}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        for suffix, labels, value in self.samples:
+            if labels:
+                label_text = ",".join(
+                    f'{k}="{_escape_label(v)}"' for k, v in labels.items()
+                )
+                lines.append(
+                    f"{self.name}{suffix}{{{label_text}}} {_format_value(value)}"
+                )
+            else:
+                lines.append(f"{self.name}{suffix} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def render_metrics(families: Iterable[MetricFamily]) -> str:
+    """Render metric families in the Prometheus text format, skipping any without samples."""
+    return "".join(f.render() for f in families if f.samples)
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value.is_integer():
+        return str(int(value))
+    return repr(value)
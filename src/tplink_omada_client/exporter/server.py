@@ -0,0 +1,147 @@
+"""HTTP endpoint serving Prometheus metrics from a background-refreshed snapshot."""
+
+import asyncio
+import logging
+import time
+
+from aiohttp import web
+
+from ..instrumentation import RequestInstrumentation
+from ..omadaclient import OmadaClient
+from ..omadasiteclient import OmadaSiteClient
+from .collector import collect_library_metrics, collect_site_metrics
+from .metrics import CONTENT_TYPE, MetricFamily, render_metrics
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class OmadaExporter:
+    """
+    Serves metrics about Omada sites, and about this library's requests, for Prometheus to scrape.
+
+    Site metrics are fetched from the controller every `refresh_interval` seconds by a background task,
+    and scrapes are answered from the latest snapshot, so scraping more often doesn't add any load
+    on the controller. Library metrics are only served if `instrumentation` is the one the client
+    was created with.
+
+        async with OmadaClient(url, username, password, instrumentation=instrumentation) as client:
+            async with OmadaExporter(client, instrumentation=instrumentation, port=9877):
+                await asyncio.Event().wait()
+    """
+
+    def __init__(
+        self,
+        client: OmadaClient,
+        sites: list[str] | None = None,
+        instrumentation: RequestInstrumentation | None = None,
+        refresh_interval: float = 60,
+        host: str = "0.0.0.0",
+        port: int = 9877,
+    ):
+        self._client = client
+        # Site names to export, or None for every site the user can see
+        self._sites = sites
+        self._instrumentation = instrumentation
+        self._refresh_interval = refresh_interval
+        self._host = host
+        self._port = port
+        self._site_clients: dict[str, OmadaSiteClient] = {}
+        self._snapshot = ""
+        self._refresh_task: asyncio.Task | None = None
+        self._runner: web.AppRunner | None = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args) -> bool:
+        await self.stop()
+        return False
+
+    @property
+    def snapshot(self) -> str:
+        """The site metrics from the last refresh, in the Prometheus text format."""
+        return self._snapshot
+
+    async def start(self) -> None:
+        """Start refreshing metrics, and serving them on /metrics."""
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle_metrics)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self._host, self._port).start()
+        self._refresh_task = asyncio.create_task(self._refresh_periodically())
+
+    async def stop(self) -> None:
+        """Stop serving and refreshing metrics."""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def render(self) -> str:
+        """All metrics, as served to a scrape."""
+        text = self._snapshot
+        if self._instrumentation is not None:
+            text += render_metrics(collect_library_metrics(self._instrumentation))
+        return text
+
+    async def refresh(self) -> None:
+        """Fetch site metrics from the controller, and replace the snapshot."""
+        site_up = MetricFamily(
+            "omada_exporter_site_up", "1 if the site's metrics were fetched successfully."
+        )
+        duration = MetricFamily(
+            "omada_exporter_refresh_duration_seconds", "Time taken to fetch the site's metrics."
+        )
+        last_refresh = MetricFamily(
+            "omada_exporter_last_refresh_timestamp_seconds", "When the metrics were last refreshed."
+        )
+
+        if self._sites is None:
+            site_names = [s.name for s in await self._client.get_sites()]
+        else:
+            site_names = self._sites
+
+        # Merge each site's samples into a single family per metric
+        families: dict[str, MetricFamily] = {}
+        for site in site_names:
+            started = time.monotonic()
+            try:
+                site_client = self._site_clients.get(site)
+                if site_client is None:
+                    site_client = self._site_clients[site] = await self._client.get_site_client(site)
+                site_families = await collect_site_metrics(site_client, site)
+            except Exception as err:  # pylint: disable=broad-except
+                # One broken site shouldn't stop the others being exported
+                _LOGGER.warning("Failed to fetch metrics for site %s: %r", site, err)
+                site_up.add(0, site=site)
+                continue
+            finally:
+                duration.add(time.monotonic() - started, site=site)
+            site_up.add(1, site=site)
+            for family in site_families:
+                merged = families.setdefault(family.name, family)
+                if merged is not family:
+                    merged.samples.extend(family.samples)
+
+        last_refresh.add(time.time())
+        self._snapshot = render_metrics([site_up, duration, last_refresh, *families.values()])
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception:  # pylint: disable=broad-except
+                # Keep serving the last snapshot until the controller is reachable again
+                _LOGGER.exception("Failed to refresh Omada metrics")
+            await asyncio.sleep(self._refresh_interval)
+
+    async def _handle_metrics(self, _: web.Request) -> web.Response:
+        return web.Response(body=self.render().encode(), headers={"Content-Type": CONTENT_TYPE})
@@ -0,0 +1,89 @@
+"""Hedged requests, to cut the tail latency of idempotent requests."""
+
+import asyncio
+from collections import deque
+import time
+from typing import Awaitable, Callable, TypeVar
+
+_T = TypeVar("_T")
+
+
+class RequestHedger:
+    """
+    Sends a second copy of a slow request, and uses whichever answers first.
+
+    A hedge is sent once a request has taken longer than the `percentile` latency of recent requests to
+    the same endpoint. Hedges are limited to `max_hedge_ratio` of all requests, so that a slow controller
+    doesn't get twice the load.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        max_hedge_ratio: float = 0.05,
+        min_samples: int = 20,
+        window: int = 100,
+    ):
+        self._percentile = percentile
+        self._max_hedge_ratio = max_hedge_ratio
+        self._min_samples = min_samples
+        self._window = window
+        self._latencies: dict[str, deque[float]] = {}
+        self._requests = 0
+        self._hedges = 0
+
+    @property
+    def requests(self) -> int:
+        """The number of requests made through the hedger."""
+        return self._requests
+
+    @property
+    def hedges(self) -> int:
+        """The number of hedge requests sent."""
+        return self._hedges
+
+    def hedge_delay(self, endpoint: str) -> float | None:
+        """How long to wait for a request to an endpoint before hedging, or None if we don't know yet."""
+        latencies = self._latencies.get(endpoint)
+        if latencies is None or len(latencies) < self._min_samples:
+            return None
+        ordered = sorted(latencies)
+        return ordered[int(self._percentile * (len(ordered) - 1))]
+
+    async def run(self, endpoint: str, send: Callable[[], Awaitable[_T]]) -> _T:
+        """Run a request, hedging it if it is slow."""
+        self._requests += 1
+        delay = self.hedge_delay(endpoint)
+
+        attempts = [asyncio.ensure_future(self._timed(endpoint, send))]
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(attempts, timeout=delay)
+                if not done and self._hedges < self._max_hedge_ratio * self._requests:
+                    self._hedges += 1
+                    attempts.append(asyncio.ensure_future(self._timed(endpoint, send)))
+
+            # The first successful response wins. Only fail if every attempt failed.
+            pending = set(attempts)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for attempt in done:
+                    if attempt.exception() is None:
+                        return attempt.result()
+            return attempts[0].result()
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+            # Collect the losers, so that their failures aren't reported as unretrieved
+            await asyncio.gather(*attempts, return_exceptions=True)
+
+    async def _timed(self, endpoint: str, send: Callable[[], Awaitable[_T]]) -> _T:
+        started = time.monotonic()
+        result = await send()
+        latencies = self._latencies.get(endpoint)
+        if latencies is None:
+            latencies = self._latencies[endpoint] = deque(maxlen=self._window)
+        latencies.append(time.monotonic() - started)
+        return result
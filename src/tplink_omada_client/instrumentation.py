@@ -0,0 +1,266 @@
+"""Instrumentation of requests made to the controller."""
+
+from bisect import bisect_left
+from dataclasses import dataclass, field
+import time
+from types import SimpleNamespace
+from typing import Callable
+
+from aiohttp import (
+    ClientSession,
+    TraceConfig,
+    TraceConnectionCreateEndParams,
+    TraceConnectionCreateStartParams,
+    TraceDnsResolveHostEndParams,
+    TraceDnsResolveHostStartParams,
+    TraceRequestEndParams,
+)
+
+from .endpoints import endpoint_template
+
+# Upper bounds of the latency histogram buckets, in seconds
+DEFAULT_LATENCY_BUCKETS: tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+)
+
+
+@dataclass
+class RequestRecord:
+    """
+    Measurements of a single HTTP request to the controller.
+
+    DNS, connect and time to first byte are only measured when the web session has the
+    instrumentation's trace config, which it does unless you supplied your own session.
+    Byte counts are of the request and response bodies.
+    """
+
+    method: str
+    # Normalized endpoint, such as 'switches/{mac}/ports/{n}'
+    endpoint: str
+    status: int | None = None
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    dns_time: float | None = None
+    connect_time: float | None = None
+    time_to_first_byte: float | None = None
+    total_time: float = 0
+    # Name of the exception, if the request failed
+    error: str | None = None
+    started: float = field(default_factory=time.perf_counter, repr=False)
+    _dns_started: float | None = field(default=None, init=False, repr=False)
+    _connect_started: float | None = field(default=None, init=False, repr=False)
+
+    @classmethod
+    def start(cls, method: str, url: str) -> "RequestRecord":
+        """Start recording a request."""
+        return cls(method.upper(), endpoint_template(url))
+
+    def finish(self, error: BaseException | None = None) -> None:
+        """Finish recording the request."""
+        self.total_time = time.perf_counter() - self.started
+        if error is not None:
+            self.error = type(error).__name__
+
+
+@dataclass
+class ConnectionEvent:
+    """Something that happened to the connection, other than a request: 'login', 'session_expired' or 'retry'."""
+
+    kind: str
+    attempt: int | None = None
+    delay: float | None = None
+    error: str | None = None
+
+
+class LatencyHistogram:
+    """Cumulative histogram of request latencies."""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_LATENCY_BUCKETS):
+        self._buckets = buckets
+        # One count per bucket, plus one for latencies above the largest bucket
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+
+    @property
+    def buckets(self) -> tuple[float, ...]:
+        """Upper bounds of the buckets, in seconds."""
+        return self._buckets
+
+    @property
+    def counts(self) -> list[int]:
+        """Number of observations in each bucket, with a final bucket for anything larger."""
+        return list(self._counts)
+
+    @property
+    def count(self) -> int:
+        """Total number of observations."""
+        return self._count
+
+    @property
+    def sum(self) -> float:
+        """Total of all observed latencies, in seconds."""
+        return self._sum
+
+    def observe(self, latency: float) -> None:
+        """Record a latency, in seconds."""
+        self._counts[bisect_left(self._buckets, latency)] += 1
+        self._sum += latency
+        self._count += 1
+
+    def percentile(self, percentile: float) -> float | None:
+        """Estimate a percentile (0 - 1) as the upper bound of the bucket it falls in."""
+        if self._count == 0:
+            return None
+        target = percentile * self._count
+        seen = 0
+        for index, count in enumerate(self._counts):
+            seen += count
+            if seen >= target:
+                break
+        if index < len(self._buckets):
+            return self._buckets[index]
+        return float("inf")
+
+
+RequestCallback = Callable[[RequestRecord], None]
+EventCallback = Callable[[ConnectionEvent], None]
+
+
+class RequestInstrumentation:
+    """
+    Records every request made to the controller, and keeps latency histograms per endpoint.
+
+    Register callbacks with `subscribe` to receive each RequestRecord, and with `subscribe_events` to be
+    told about logins, expired sessions and retries.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_LATENCY_BUCKETS):
+        self._buckets = buckets
+        self._histograms: dict[tuple[str, str], LatencyHistogram] = {}
+        self._errors: dict[tuple[str, str], int] = {}
+        self._event_counts: dict[str, int] = {}
+        self._subscribers: list[RequestCallback] = []
+        self._event_subscribers: list[EventCallback] = []
+        self._trace_config = self._create_trace_config()
+
+    @property
+    def histograms(self) -> dict[tuple[str, str], LatencyHistogram]:
+        """Latency histograms, keyed by method and normalized endpoint."""
+        return self._histograms
+
+    @property
+    def errors(self) -> dict[tuple[str, str], int]:
+        """Number of failed requests, keyed by method and normalized endpoint."""
+        return self._errors
+
+    @property
+    def event_counts(self) -> dict[str, int]:
+        """Number of connection events (logins, retries...) by kind."""
+        return self._event_counts
+
+    def trace_config(self) -> TraceConfig:
+        """
+        The aiohttp trace config that measures request phases.
+
+        It is added automatically to the web session the client creates. If you supply your own session,
+        pass this in its `trace_configs` to get detailed timings.
+        """
+        return self._trace_config
+
+    def subscribe(self, callback: RequestCallback) -> Callable[[], None]:
+        """Call `callback` with every completed request. Returns a function that unsubscribes."""
+        self._subscribers.append(callback)
+        return lambda: self._subscribers.remove(callback)
+
+    def subscribe_events(self, callback: EventCallback) -> Callable[[], None]:
+        """Call `callback` with every connection event. Returns a function that unsubscribes."""
+        self._event_subscribers.append(callback)
+        return lambda: self._event_subscribers.remove(callback)
+
+    def report_request(self, record: RequestRecord) -> None:
+        """Report a finished request."""
+        key = (record.method, record.endpoint)
+        if record.error is not None:
+            self._errors[key] = self._errors.get(key, 0) + 1
+
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = LatencyHistogram(self._buckets)
+        histogram.observe(record.total_time)
+
+        for callback in list(self._subscribers):
+            try:
+                callback(record)
+            except Exception:  # pylint: disable=broad-except
+                # A broken subscriber mustn't break requests
+                pass
+
+    def record_event(self, event: ConnectionEvent) -> None:
+        """Report a connection event."""
+        self._event_counts[event.kind] = self._event_counts.get(event.kind, 0) + 1
+        for callback in list(self._event_subscribers):
+            try:
+                callback(event)
+            except Exception:  # pylint: disable=broad-except
+                pass
+
+    @staticmethod
+    def _create_trace_config() -> TraceConfig:
+        trace_config = TraceConfig()
+
+        def record_of(context: SimpleNamespace) -> RequestRecord | None:
+            record = context.trace_request_ctx
+            return record if isinstance(record, RequestRecord) else None
+
+        async def on_dns_start(
+            _: ClientSession, context: SimpleNamespace, __: TraceDnsResolveHostStartParams
+        ) -> None:
+            if record := record_of(context):
+                record._dns_started = time.perf_counter()
+
+        async def on_dns_end(
+            _: ClientSession, context: SimpleNamespace, __: TraceDnsResolveHostEndParams
+        ) -> None:
+            if (record := record_of(context)) and record._dns_started is not None:
+                record.dns_time = time.perf_counter() - record._dns_started
+
+        async def on_connect_start(
+            _: ClientSession,
+            context: SimpleNamespace,
+            __: TraceConnectionCreateStartParams,
+        ) -> None:
+            if record := record_of(context):
+                record._connect_started = time.perf_counter()
+
+        async def on_connect_end(
+            _: ClientSession, context: SimpleNamespace, __: TraceConnectionCreateEndParams
+        ) -> None:
+            if (record := record_of(context)) and record._connect_started is not None:
+                record.connect_time = time.perf_counter() - record._connect_started
+
+        async def on_request_end(
+            _: ClientSession, context: SimpleNamespace, params: TraceRequestEndParams
+        ) -> None:
+            # Fires once the response headers have arrived
+            if record := record_of(context):
+                record.time_to_first_byte = time.perf_counter() - record.started
+                record.status = params.response.status
+
+        trace_config.on_dns_resolvehost_start.append(on_dns_start)
+        trace_config.on_dns_resolvehost_end.append(on_dns_end)
+        trace_config.on_connection_create_start.append(on_connect_start)
+        trace_config.on_connection_create_end.append(on_connect_end)
+        trace_config.on_request_end.append(on_request_end)
+        return trace_config
@@ -0,0 +1,73 @@
+"""JSON encoding and decoding of request and response bodies."""
+
+import json
+from typing import Any, Protocol
+
+
+class JsonCodec(Protocol):
+    """Encodes request bodies and decodes response bodies."""
+
+    def dumps(self, obj: Any) -> bytes:
+        """Encode an object as UTF-8 JSON."""
+
+    def loads(self, data: bytes) -> Any:
+        """Decode UTF-8 JSON."""
+
+
+class StdlibJsonCodec:
+    """JSON codec using the standard library json module."""
+
+    def dumps(self, obj: Any) -> bytes:
+        """Encode an object as UTF-8 JSON."""
+        return json.dumps(obj).encode("utf-8")
+
+    def loads(self, data: bytes) -> Any:
+        """Decode UTF-8 JSON."""
+        return json.loads(data.decode("utf-8"))
+
+
+class OrjsonCodec:
+    """JSON codec using orjson."""
+
+    def __init__(self):
+        import orjson  # pylint: disable=import-outside-toplevel
+
+        self._orjson = orjson
+        # The standard library converts non-string keys to strings, so do the same
+        self._options = orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj: Any) -> bytes:
+        """Encode an object as UTF-8 JSON."""
+        return self._orjson.dumps(obj, option=self._options)
+
+    def loads(self, data: bytes) -> Any:
+        """Decode UTF-8 JSON."""
+        return self._orjson.loads(data)
+
+
+class MsgspecCodec:
+    """JSON codec using msgspec."""
+
+    def __init__(self):
+        import msgspec  # pylint: disable=import-outside-toplevel
+
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+
+    def dumps(self, obj: Any) -> bytes:
+        """Encode an object as UTF-8 JSON."""
+        return self._encoder.encode(obj)
+
+    def loads(self, data: bytes) -> Any:
+        """Decode UTF-8 JSON."""
+        return self._decoder.decode(data)
+
+
+def default_codec() -> JsonCodec:
+    """Get the fastest JSON codec that is installed, falling back to the standard library."""
+    for codec_type in (OrjsonCodec, MsgspecCodec):
+        try:
+            return codec_type()
+        except ImportError:
+            continue
+    return StdlibJsonCodec()
@@ -0,0 +1,143 @@
+"""Adaptive limit on the number of concurrent requests to a controller."""
+
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+import time
+from typing import AsyncIterator
+
+from aiohttp import client_exceptions
+
+from .exceptions import is_transient_error
+
+
+def _is_overload_error(error: BaseException) -> bool:
+    """
+    True if a request failure suggests the controller is overloaded.
+
+    Requests cut short by the caller's own deadline fail with DeadlineExceeded rather than a timeout,
+    so they don't count.
+    """
+    if isinstance(
+        error, (client_exceptions.ClientConnectionError, asyncio.TimeoutError)
+    ):
+        return True
+    return is_transient_error(error)
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Limits in-flight requests to a controller, adapting the limit to how the controller copes (AIMD).
+
+    The limit grows by one request each time a full window of requests completes without latency rising
+    above `latency_tolerance` times the baseline latency of the endpoint. It is cut by `backoff_ratio`
+    when latency rises too far, or requests fail with connection errors or 5xx errors. Baselines are
+    kept for each endpoint, as a large list is always slower than a small update. Hardware controllers end up with
+    a low limit, and software controllers with a high one.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        latency_tolerance: float = 2.0,
+        backoff_ratio: float = 0.7,
+    ):
+        self._limit = float(initial_limit)
+        self._min_limit = min_limit
+        self._max_limit = max_limit
+        self._latency_tolerance = latency_tolerance
+        self._backoff_ratio = backoff_ratio
+        self._in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._baseline_latencies: dict[str | None, float] = {}
+        self._last_decrease = 0.0
+
+    @property
+    def limit(self) -> int:
+        """The current limit on concurrent requests."""
+        return max(self._min_limit, int(self._limit))
+
+    @property
+    def in_flight(self) -> int:
+        """The number of requests currently in flight."""
+        return self._in_flight
+
+    def baseline_latency(self, endpoint: str | None = None) -> float | None:
+        """The latency of an unloaded request to an endpoint, in seconds, as far as we can tell."""
+        return self._baseline_latencies.get(endpoint)
+
+    @asynccontextmanager
+    async def slot(self, endpoint: str | None = None) -> AsyncIterator[None]:
+        """
+        Wait for a free slot, and hold it while making a request.
+
+        `endpoint` identifies the kind of request, such as an endpoint template, for its baseline latency.
+        """
+        await self._acquire()
+        started = time.monotonic()
+        try:
+            yield
+        except BaseException as err:
+            if _is_overload_error(err):
+                self._decrease(self._baseline_latencies.get(endpoint, 0))
+            raise
+        else:
+            self._record_success(endpoint, time.monotonic() - started)
+        finally:
+            self._release()
+
+    async def _acquire(self) -> None:
+        if self._in_flight < self.limit and not self._waiters:
+            self._in_flight += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # We were handed a slot at the same time as being cancelled, so pass it on
+                self._release()
+            elif waiter in self._waiters:
+                # A cancelled waiter may already have been skipped by _wake_waiters
+                self._waiters.remove(waiter)
+            raise
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+        self._wake_waiters()
+
+    def _wake_waiters(self) -> None:
+        while self._waiters and self._in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # The slot is taken on behalf of the waiter
+                self._in_flight += 1
+                waiter.set_result(None)
+
+    def _record_success(self, endpoint: str | None, latency: float) -> None:
+        baseline = self._baseline_latencies.get(endpoint)
+        if baseline is None or latency < baseline:
+            baseline = latency
+        else:
+            # Let the baseline drift up slowly, in case the controller's normal latency changes
+            baseline += (latency - baseline) * 0.01
+        self._baseline_latencies[endpoint] = baseline
+
+        if latency > self._latency_tolerance * baseline:
+            self._decrease(baseline)
+        elif self._in_flight >= self.limit:
+            # Only grow the limit while it is actually constraining us
+            self._limit = min(self._max_limit, self._limit + 1 / self._limit)
+            self._wake_waiters()
+
+    def _decrease(self, baseline: float) -> None:
+        now = time.monotonic()
+        # A burst of slow or failed requests should only cut the limit once
+        if now - self._last_decrease < baseline:
+            return
+        self._last_decrease = now
+        self._limit = max(self._min_limit, self._limit * self._backoff_ratio)
@@ -1,11 +1,24 @@
 """Internal Omada API client."""
 
+import asyncio
+from contextlib import asynccontextmanager, nullcontext
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+import logging
+import random
 import time
-from typing import Any, AsyncIterable
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, TypeVar
 
 import re
 from urllib.parse import urlsplit, urljoin
-from aiohttp import Payload, client_exceptions, CookieJar
+from aiohttp import (
+    ClientResponse,
+    ClientTimeout,
+    Payload,
+    TCPConnector,
+    client_exceptions,
+    CookieJar,
+)
 from aiohttp.client import ClientSession
 from awesomeversion import AwesomeVersion
 import aiofiles
@@ -14,15 +27,153 @@ import pathlib
 from .exceptions import (
     BadControllerUrl,
     ConnectionFailed,
+    DeadlineExceeded,
     LoginFailed,
     LoginSessionClosed,
+    OmadaClientException,
     RequestFailed,
+    RequestTimeout,
     UnsupportedControllerVersion,
+    is_transient_error,
 )
+from .budget import active_budgets
+from .circuitbreaker import CircuitBreaker
+from .deadline import context_without_deadline, remaining_time
+from .endpoints import endpoint_template, match_endpoint_policy, parse_endpoint
+from .hedging import RequestHedger
+from .instrumentation import ConnectionEvent, RequestInstrumentation, RequestRecord
+from .jsoncodec import JsonCodec, default_codec
+from .limiter import AdaptiveConcurrencyLimiter
+from .responsecache import OmadaResponseCache
+from .tracing import end_request_span, start_request_span
+
 
+_LOGGER = logging.getLogger(__name__)
 
 _PAGE_SIZE: int = 100
 
+# Controller error codes that mean the login session has expired, and we need to log in again
+_SESSION_EXPIRED_ERROR_CODES: frozenset[int] = frozenset({-1200})
+
+# Assume a login session lasts this long, until we observe otherwise
+_DEFAULT_SESSION_LIFETIME: float = 60 * 60
+# Never refresh an idle session more often than this
+_MIN_SESSION_LIFETIME: float = 60
+# How much a learned session lifetime grows each time a session outlasts half of it
+_SESSION_LIFETIME_GROWTH: float = 1.25
+
+_T = TypeVar("_T")
+
+# Which attempt at a request is being sent, for tracing
+_request_attempt: ContextVar[int] = ContextVar("omada_request_attempt", default=1)
+
+
+def _log_request(record: RequestRecord) -> None:
+    """Log a finished request at debug level."""
+    _LOGGER.debug(
+        "%s %s -> %s in %.3fs, sent %d bytes, received %d bytes%s",
+        record.method,
+        record.endpoint,
+        record.status,
+        record.total_time,
+        record.bytes_sent,
+        record.bytes_received,
+        f", failed with {record.error}" if record.error is not None else "",
+        extra={
+            "omada_method": record.method,
+            "omada_endpoint": record.endpoint,
+            "omada_status": record.status,
+            "omada_duration": record.total_time,
+            "omada_bytes_sent": record.bytes_sent,
+            "omada_bytes_received": record.bytes_received,
+            "omada_error": record.error,
+        },
+    )
+
+
+def _body_size(data: bytes | Payload | None) -> int:
+    """Size of a request body, if it is known."""
+    if data is None:
+        return 0
+    if isinstance(data, bytes):
+        return len(data)
+    return data.size or 0
+
+
+def _freeze_params(params: dict[str, Any] | None) -> tuple:
+    """Convert request parameters to a hashable key."""
+    if not params:
+        return ()
+    return tuple(sorted((key, str(value)) for key, value in params.items()))
+
+
+@asynccontextmanager
+async def _deadline_timeouts(deadline_bound: bool) -> AsyncIterator[None]:
+    """
+    Report a request timing out as DeadlineExceeded if its timeout was cut to the time left before
+    the caller's deadline, so that it isn't mistaken for the controller being slow.
+    """
+    try:
+        yield
+    except asyncio.TimeoutError as err:
+        if not deadline_bound:
+            raise
+        raise DeadlineExceeded("Operation deadline exceeded") from err
+
+
+@dataclass
+class ConnectionPoolSettings:
+    """
+    Connection pool settings for the web session created by the client.
+
+    These are not used if you supply your own ClientSession.
+    """
+
+    # Total number of simultaneous connections (0 for no limit)
+    limit: int = 100
+    # Simultaneous connections to the controller (0 for no limit)
+    limit_per_host: int = 0
+    # Seconds to keep idle connections open for reuse
+    keepalive_timeout: float = 15
+    # Seconds to cache DNS lookups for (None to cache forever)
+    ttl_dns_cache: int | None = 10
+    # Close connections after each request, instead of keeping them alive
+    force_close: bool = False
+
+
+@dataclass
+class RetryPolicy:
+    """Policy for retrying requests that fail with a connection error, or a 5xx HTTP status."""
+
+    # Total attempts, including the first
+    max_attempts: int = 3
+    # Upper bound of the randomised delay before the first retry, doubling for each retry after
+    backoff_base: float = 0.5
+    backoff_max: float = 10
+    # Stop retrying once a retry couldn't start within this many seconds of the first attempt
+    total_budget: float = 30
+    # HTTP methods that can be retried safely
+    methods: frozenset[str] = frozenset({"get"})
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Delay before retrying after the given attempt, with full jitter to spread retries out."""
+        return random.uniform(
+            0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        )
+
+
+@dataclass
+class RequestTimeouts:
+    """Timeouts for requests to the controller, in seconds. None means no timeout."""
+
+    default: float | None = 30
+    # File downloads, such as packet captures
+    download: float | None = 300
+    # Overrides by endpoint family (site-relative endpoint prefixes), for endpoints that are legitimately slow
+    endpoints: dict[str, float | None] = field(
+        default_factory=lambda: {"capture": 120}
+    )
+
 
 class OmadaApiConnection:
     """Low level Omada API client."""
@@ -32,6 +183,7 @@ class OmadaApiConnection:
     _controller_version: str | None = None
     _csrf_token: str | None
     _last_logon: float
+    _last_activity: float
 
     def __init__(
         self,
@@ -40,7 +192,54 @@ class OmadaApiConnection:
         password: str,
         websession: ClientSession | None = None,
         verify_ssl=True,
+        optimistic_login=False,
+        keepalive=False,
+        deduplicate_requests=False,
+        cache: OmadaResponseCache | None = None,
+        json_codec: JsonCodec | None = None,
+        pool_settings: ConnectionPoolSettings | None = None,
+        retry_policy: RetryPolicy | None = None,
+        concurrency_limiter: AdaptiveConcurrencyLimiter | None = None,
+        timeouts: RequestTimeouts | None = None,
+        hedger: RequestHedger | None = None,
+        circuit_breaker: CircuitBreaker | None = None,
+        instrumentation: RequestInstrumentation | None = None,
     ):
+        """
+        Create a connection to an Omada controller.
+
+        If `optimistic_login` is True, the login session is assumed to be valid until a request
+        fails because it has expired, rather than being checked before requests once it is an hour old.
+        Either way, requests that fail because the session expired are replayed once after logging in again.
+
+        If `keepalive` is True, a background task refreshes the login session while the connection is
+        idle, so that the first request after an idle period doesn't have to log in again. The task runs
+        from the first login until the connection is closed.
+
+        If `deduplicate_requests` is True, identical GET requests that are made while one is already in
+        flight share its response, instead of each being sent to the controller.
+
+        If a `cache` is given, GET responses are cached according to its policy, and invalidated by
+        any other request for the same site.
+
+        `json_codec` encodes request bodies and decodes responses. By default, the fastest installed
+        codec is used (orjson, then msgspec, then the standard library).
+
+        `pool_settings` configure the connection pool of the web session, if one isn't supplied.
+
+        If a `retry_policy` is given, requests that fail with transient errors are retried.
+
+        If a `concurrency_limiter` is given, it caps the number of requests in flight to the controller.
+
+        `timeouts` limit how long each request can take. Use `deadline()` to limit a whole operation.
+
+        If a `hedger` is given, GET requests that are slower than usual are hedged with a second request.
+
+        If a `circuit_breaker` is given, requests fail fast with ControllerUnavailable while the controller
+        is failing.
+
+        If `instrumentation` is given, every request is measured and reported to it.
+        """
         if not url.lower().startswith(("http://", "https://")):
             url = "https://" + url
         url_parts = urlsplit(url, "https://")
@@ -53,6 +252,26 @@ class OmadaApiConnection:
         self._session = websession
         self._verify_ssl = verify_ssl
         self._csrf_token = None
+        self._optimistic_login = optimistic_login
+        self._own_session = False
+        self._keepalive = keepalive
+        self._keepalive_task: asyncio.Task | None = None
+        # Set by close(), logout() and __aexit__, so that a late login doesn't restart the keepalive task
+        self._closed = False
+        self._session_lifetime = _DEFAULT_SESSION_LIFETIME
+        self._deduplicate_requests = deduplicate_requests
+        self._in_flight: dict[tuple[str, tuple], asyncio.Future] = {}
+        self._cache = cache
+        self._json_codec = json_codec or default_codec()
+        self._pool_settings = pool_settings or ConnectionPoolSettings()
+        self._retry_policy = retry_policy
+        self._concurrency_limiter = concurrency_limiter
+        self._timeouts = timeouts or RequestTimeouts()
+        self._hedger = hedger
+        self._circuit_breaker = circuit_breaker
+        self._instrumentation = instrumentation
+        # Serialises session checks and logins, so concurrent requests share a single re-login
+        self._login_lock = asyncio.Lock()
 
     async def _get_session(self) -> ClientSession:
         if self._session is None:
@@ -63,7 +282,23 @@ class OmadaApiConnection:
                 is None
                 else CookieJar(unsafe=True)
             )
-            self._session = ClientSession(cookie_jar=jar)
+            pool = self._pool_settings
+            connector = TCPConnector(
+                limit=pool.limit,
+                limit_per_host=pool.limit_per_host,
+                # Keepalive timeout can't be set when connections are force closed
+                keepalive_timeout=None if pool.force_close else pool.keepalive_timeout,
+                ttl_dns_cache=pool.ttl_dns_cache,
+                force_close=pool.force_close,
+            )
+            trace_configs = (
+                [self._instrumentation.trace_config()]
+                if self._instrumentation is not None
+                else None
+            )
+            self._session = ClientSession(
+                cookie_jar=jar, connector=connector, trace_configs=trace_configs
+            )
         return self._session
 
     async def __aenter__(self):
@@ -77,6 +312,8 @@ class OmadaApiConnection:
 
     async def __aexit__(self, exc_type, exc_val, exc_tb) -> bool:
         """Call when the client is disposed."""
+        self._closed = True
+        await self._stop_keepalive()
         # Close the web session, if we created it (i.e. it was not passed in)
         if self._own_session:
             await self.close()
@@ -84,6 +321,8 @@ class OmadaApiConnection:
 
     async def close(self):
         """Close the current web session."""
+        self._closed = True
+        await self._stop_keepalive()
         if self._session:
             await self._session.close()
             self._session = None
@@ -95,7 +334,11 @@ class OmadaApiConnection:
         Calls to login are optional, as the API will automatically authenticate as necessary.
         However, you may want to attempt a login to check connectivity.
         """
+        async with self._login_lock:
+            self._closed = False
+            return await self._login()
 
+    async def _login(self) -> str:
         version, controller_id = await self._get_controller_info()
 
         if AwesomeVersion(version) < AwesomeVersion("5.1.0"):
@@ -108,34 +351,150 @@ class OmadaApiConnection:
         response = await self._do_request("post", self.format_url("login"), json=auth)
 
         self._csrf_token = response["token"]
-        self._last_logon = time.time()
+        self._last_logon = self._last_activity = time.time()
+        self._record_event(ConnectionEvent("login"))
+
+        if self._keepalive and self._keepalive_task is None and not self._closed:
+            self._keepalive_task = asyncio.create_task(self._keep_session_alive())
 
         return self._controller_id
 
     async def logout(self):
         """Logout from the controller."""
+        self._closed = True
+        await self._stop_keepalive()
         response = await self._do_request("post", self.format_url("logout"))
         self._csrf_token = None
 
+    async def _ensure_login(self) -> None:
+        """
+        Make sure we have a valid login session before making a request.
+
+        Only one caller at a time checks the session and logs in. Callers queued behind a re-login
+        find the new session is valid when they get the lock, so they don't log in again.
+        """
+        async with self._login_lock:
+            if not await self._check_login():
+                await self._login()
+
     async def _check_login(self) -> bool:
         if self._csrf_token is None:
             return False
 
-        if time.time() - self._last_logon < 60 * 60:
+        if (
+            self._optimistic_login
+            or time.time() - self._last_logon < _DEFAULT_SESSION_LIFETIME
+        ):
             # Assume 1hr is good for a login to remain active
             return True
 
+        return await self._refresh_session()
+
+    async def _refresh_session(self) -> bool:
+        """Check the login session with the controller, which also keeps it alive."""
         try:
+            idle_time = time.time() - self._last_activity
             response = await self._do_request("get", self.format_url("loginStatus"))
             logged_in = bool(response["login"])
+            self._learn_session_lifetime(idle_time, expired=not logged_in)
             if logged_in:
-                self._last_logon = time.time()
+                self._last_logon = self._last_activity = time.time()
             else:
                 self._csrf_token = None
             return logged_in
-        except:  # pylint: disable=bare-except  # noqa: E722
+        except Exception:  # pylint: disable=broad-exception-caught
             return False
 
+    async def _keep_session_alive(self) -> None:
+        """Background task to refresh the login session before it expires through inactivity."""
+        while True:
+            # Refresh well within the session lifetime, counting from the last time the session was used
+            interval = self._session_lifetime / 2
+            delay = self._last_activity + interval - time.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            try:
+                async with self._login_lock:
+                    if not await self._refresh_session():
+                        await self._login()
+            except OmadaClientException as err:
+                # The controller may be unavailable. Try again later, and let requests log in if they need to.
+                _LOGGER.debug("Failed to refresh the login session: %r", err)
+                await asyncio.sleep(interval)
+            except Exception:  # pylint: disable=broad-exception-caught
+                # Anything else is a bug, but it mustn't end the task while _keepalive_task still refers to it
+                _LOGGER.exception("Unexpected error refreshing the login session")
+                await asyncio.sleep(interval)
+
+    async def _stop_keepalive(self) -> None:
+        task = self._keepalive_task
+        if task is None:
+            return
+        self._keepalive_task = None
+        if task is not asyncio.current_task():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _renew_login(self, expired_token: str | None) -> None:
+        """Log in again after a request was rejected because the session expired."""
+        async with self._login_lock:
+            # Another request may already have renewed the session while we waited
+            if self._csrf_token == expired_token:
+                await self._login()
+
+    def _is_session_expired(self, error: Exception) -> bool:
+        if isinstance(error, LoginSessionClosed):
+            return True
+        return (
+            isinstance(error, RequestFailed)
+            and error.error_code in _SESSION_EXPIRED_ERROR_CODES
+        )
+
+    async def _request_with_session(self, do_request: Callable[[], Awaitable[_T]]) -> _T:
+        """
+        Run a request with a valid login session.
+
+        If the controller says the session has expired, log in again and replay the request once.
+        """
+        await self._ensure_login()
+        token = self._csrf_token
+        idle_time = time.time() - self._last_activity
+        try:
+            result = await do_request()
+            self._last_activity = time.time()
+            self._learn_session_lifetime(idle_time, expired=False)
+            return result
+        except (LoginSessionClosed, RequestFailed) as err:
+            if not self._is_session_expired(err):
+                raise
+
+        self._record_event(ConnectionEvent("session_expired"))
+        self._learn_session_lifetime(idle_time, expired=True)
+
+        await self._renew_login(token)
+        result = await do_request()
+        self._last_activity = time.time()
+        return result
+
+    def _learn_session_lifetime(self, idle_time: float, expired: bool) -> None:
+        """Adjust how long we expect a login session to last, after using it when it was idle for `idle_time`."""
+        lifetime = self._session_lifetime
+        if expired:
+            # Don't rely on the session lasting any longer than this
+            lifetime = min(lifetime, idle_time)
+        elif idle_time >= lifetime / 2:
+            # The session lasted at least this long. Allow a little longer next time, so that the lifetime
+            # recovers from an expiry that wasn't down to being idle, such as the controller restarting.
+            lifetime = max(idle_time, lifetime * _SESSION_LIFETIME_GROWTH)
+        self._session_lifetime = max(
+            _MIN_SESSION_LIFETIME, min(_DEFAULT_SESSION_LIFETIME, lifetime)
+        )
+
     async def _get_controller_info(self) -> tuple[str, str]:
         """Get Omada controller version and Id (unauthenticated)."""
 
@@ -160,40 +519,272 @@ class OmadaApiConnection:
         return urljoin(self._url, f"/openapi/v1/{self._controller_id}{end_point}")
 
     async def iterate_pages(
-        self, url: str, params: dict[str, Any] | None = None
+        self,
+        url: str,
+        params: dict[str, Any] | None = None,
+        page_size: int = _PAGE_SIZE,
+        concurrency: int = 1,
+        ordered: bool = True,
     ) -> AsyncIterable[dict[str, Any]]:
-        """Iterates all the entries of a paged endpoint"""
+        """
+        Iterates all the entries of a paged endpoint.
+
+        By default, pages are fetched one after another. With a concurrency greater than 1, the first
+        page is used to work out how many pages there are, and the remaining pages are requested
+        concurrently, with at most `concurrency` requests in flight. Entries are still yielded in page
+        order, unless `ordered` is False, in which case pages are yielded as soon as they arrive.
+
+        The controller may return smaller pages than `page_size`, if it doesn't allow the size requested.
+        """
         request_params = {}
         if params is not None:
             request_params.update(params)
-        actual_page_size = _PAGE_SIZE
-
-        current_page = 1
-        has_next = True
-        while has_next:
-            request_params["currentPageSize"] = actual_page_size
-            request_params["currentPage"] = current_page
-            response = await self.request("get", url, request_params)
-
-            # Setup next page request
-            actual_page_size = int(response["currentSize"])
-            total_rows = int(response["totalRows"])
-            has_next = total_rows > current_page * actual_page_size
-            current_page += 1
-
-            data: list[dict[str, Any]] = response["data"]
-            for item in data:
+
+        if concurrency <= 1:
+            actual_page_size = page_size
+            current_page = 1
+            has_next = True
+            while has_next:
+                response = await self._request_page(
+                    url, request_params, current_page, actual_page_size
+                )
+
+                # Setup next page request
+                actual_page_size = int(response["currentSize"])
+                total_rows = int(response["totalRows"])
+                has_next = total_rows > current_page * actual_page_size
+                current_page += 1
+
+                data: list[dict[str, Any]] = response["data"]
+                for item in data:
+                    yield item
+            return
+
+        first_page = await self._request_page(url, request_params, 1, page_size)
+
+        # The controller tells us the page size it is actually using
+        actual_page_size = int(first_page["currentSize"])
+        total_rows = int(first_page["totalRows"])
+        page_count = 1
+        if actual_page_size > 0 and total_rows > actual_page_size:
+            page_count = -(-total_rows // actual_page_size)
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch_page(page: int) -> dict[str, Any]:
+            async with semaphore:
+                return await self._request_page(
+                    url, request_params, page, actual_page_size
+                )
+
+        # Start on the other pages before handing out the first, so they load while the caller works
+        tasks = [
+            asyncio.ensure_future(fetch_page(page))
+            for page in range(2, page_count + 1)
+        ]
+        try:
+            for item in first_page["data"]:
                 yield item
+            for next_page in tasks if ordered else asyncio.as_completed(tasks):
+                response = await next_page
+                for item in response["data"]:
+                    yield item
+        finally:
+            # Don't leave requests running if the caller stops iterating early, or a page fails
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _request_page(
+        self, url: str, params: dict[str, Any], page: int, page_size: int
+    ) -> dict[str, Any]:
+        request_params = dict(params)
+        request_params["currentPageSize"] = page_size
+        request_params["currentPage"] = page
+        response = await self.request("get", url, request_params)
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug(
+                "Fetched page %d of %s: %d rows of %s",
+                page,
+                endpoint_template(url),
+                len(response["data"]),
+                response["totalRows"],
+                extra={
+                    "omada_endpoint": endpoint_template(url),
+                    "omada_page": page,
+                    "omada_page_size": page_size,
+                    "omada_total_rows": response["totalRows"],
+                },
+            )
+        return response
 
     async def request(
-        self, method: str, url: str, params=None, json=None, data: Payload | None = None
+        self,
+        method: str,
+        url: str,
+        params=None,
+        json=None,
+        data: Payload | None = None,
+        retry: bool = True,
     ) -> Any:
-        """Perform a request specific to the controlller, with authentication"""
+        """
+        Perform a request specific to the controlller, with authentication
 
-        if not await self._check_login():
-            await self.login()
+        Transient failures are retried according to the connection's retry policy, unless `retry` is False.
+
+        When request deduplication or caching is enabled, GET results may be shared between callers,
+        and must not be modified.
+        """
+
+        is_get = method.lower() == "get" and json is None and data is None
+        cache = self._cache
+
+        if not is_get:
+            try:
+                return await self._send(method, url, params, json, data, retry)
+            finally:
+                # Even a failed request might have changed something
+                if cache is not None:
+                    cache.invalidate(url)
+                self._forget_in_flight(url)
+
+        if cache is not None and cache.is_cacheable(url):
+            found, result = cache.get(url, params)
+            if found:
+                return result
+            generation = cache.generation
+            result = await self._request_get(url, params, retry)
+            cache.put(url, params, result, generation)
+            return result
+
+        return await self._request_get(url, params, retry)
+
+    async def _request_get(self, url: str, params, retry: bool) -> Any:
+        if self._deduplicate_requests:
+            return await self._request_shared(url, params, retry)
+        return await self._send("get", url, params, None, None, retry)
+
+    async def _request_shared(self, url: str, params, retry: bool) -> Any:
+        """Perform a GET request, or join an identical one that is already in flight."""
+        key = (url, _freeze_params(params))
+        in_flight = self._in_flight.get(key)
+        if in_flight is None:
+            # The request is shared, so it mustn't be bound by the deadline of whoever started it
+            in_flight = asyncio.get_running_loop().create_task(
+                self._send("get", url, params, None, None, retry),
+                context=context_without_deadline(),
+            )
+            self._in_flight[key] = in_flight
 
-        return await self._do_request(method, url, params=params, json=json, data=data)
+            def _request_done(future: asyncio.Future) -> None:
+                # A write may have replaced this request with a newer one
+                if self._in_flight.get(key) is future:
+                    del self._in_flight[key]
+                # Mark any failure as retrieved, in case every caller was cancelled
+                if not future.cancelled():
+                    future.exception()
+
+            in_flight.add_done_callback(_request_done)
+
+        # One caller being cancelled must not cancel the request for the others
+        remaining = remaining_time()
+        if remaining is None:
+            return await asyncio.shield(in_flight)
+
+        # Each caller only waits as long as its own deadline allows
+        timeout = asyncio.timeout(remaining)
+        try:
+            async with timeout:
+                return await asyncio.shield(in_flight)
+        except TimeoutError as err:
+            if not timeout.expired():
+                raise
+            raise DeadlineExceeded("Operation deadline exceeded") from err
+
+    def _forget_in_flight(self, url: str) -> None:
+        """
+        Stop later GETs joining requests that started before a change to `url`, as they may return
+        the old data. The requests still complete for the callers already waiting on them.
+        """
+        site = parse_endpoint(url)[0]
+        stale = [
+            key
+            for key in self._in_flight
+            if site is None or parse_endpoint(key[0])[0] == site
+        ]
+        for key in stale:
+            del self._in_flight[key]
+
+    async def _send(
+        self, method: str, url: str, params, json, data: Payload | None, retry: bool
+    ) -> Any:
+        """Send a request to the controller with a login session, retrying transient failures."""
+
+        send = self._guard_request(
+            lambda: self._request_with_session(
+                lambda: self._do_request(method, url, params=params, json=json, data=data)
+            )
+        )
+
+        hedger = self._hedger
+        if hedger is not None and method.lower() == "get":
+            template = endpoint_template(url)
+            return await self._with_retries(
+                method, retry, lambda: hedger.run(template, send)
+            )
+
+        return await self._with_retries(method, retry, send)
+
+    def _guard_request(
+        self, send: Callable[[], Awaitable[_T]]
+    ) -> Callable[[], Awaitable[_T]]:
+        """Route a request through the circuit breaker, if there is one."""
+        breaker = self._circuit_breaker
+        if breaker is None:
+            return send
+        return lambda: breaker.call(send, self._probe_controller)
+
+    async def _probe_controller(self) -> None:
+        """Check that the controller is answering, for the circuit breaker."""
+        # The probe decides the health of the controller for every caller, so a short deadline
+        # on the request that happens to run it mustn't cut it short
+        await asyncio.get_running_loop().create_task(
+            self._get_controller_info(), context=context_without_deadline()
+        )
+
+    async def _with_retries(
+        self, method: str, retry: bool, send: Callable[[], Awaitable[_T]]
+    ) -> _T:
+        """Retry a request that fails with a transient error, with backoff, according to the retry policy."""
+        policy = self._retry_policy
+        if policy is None or not retry or method.lower() not in policy.methods:
+            return await send()
+
+        started = time.monotonic()
+        attempt = 1
+        while True:
+            token = _request_attempt.set(attempt)
+            try:
+                return await send()
+            except (ConnectionFailed, RequestFailed) as err:
+                if attempt >= policy.max_attempts or not is_transient_error(err):
+                    raise
+                delay = policy.backoff_delay(attempt)
+                # Don't start a retry we won't have time to finish
+                if time.monotonic() - started + delay > policy.total_budget:
+                    raise
+                remaining = remaining_time()
+                if remaining is not None and remaining <= delay:
+                    raise
+                self._record_event(
+                    ConnectionEvent(
+                        "retry", attempt=attempt, delay=delay, error=type(err).__name__
+                    )
+                )
+            finally:
+                _request_attempt.reset(token)
+            await asyncio.sleep(delay)
+            attempt += 1
 
     async def get_controller_version(self) -> AwesomeVersion:
         """Get the controller version as an AwesomeVersion object."""
@@ -217,20 +808,28 @@ class OmadaApiConnection:
             headers["Omada-Request-Source"] = "web-local"
             headers["Referer"] = self._url + "/"
             headers["Origin"] = self._url
+        if json is not None:
+            data = self._json_codec.dumps(json)
+            headers["Content-Type"] = "application/json"
+        timeout, deadline_bound = self._request_timeout(url, download=False)
 
         try:
-            async with session.request(
+            async with self._request_context(method, url, deadline_bound) as trace, session.request(
                 method,
                 url,
                 params=params,
                 headers=headers,
-                json=json,
                 data=data,
                 ssl=self._verify_ssl,
+                timeout=timeout,
+                trace_request_ctx=trace,
             ) as response:
+                if trace is not None:
+                    trace.status = response.status
+                    trace.bytes_sent = _body_size(data)
                 if response.status != 200:
                     if response.content_type == "application/json":
-                        content = await response.json(encoding="utf-8")
+                        content = await self._read_json(response, trace)
                         self._check_application_errors(content)
 
                     raise RequestFailed(response.status, "HTTP Request Error")
@@ -239,7 +838,7 @@ class OmadaApiConnection:
                 if response.content_type != "application/json":
                     raise LoginSessionClosed()
 
-                content = await response.json(encoding="utf-8")
+                content = await self._read_json(response, trace)
                 self._check_application_errors(content)
 
                 # Unpack response data
@@ -249,11 +848,110 @@ class OmadaApiConnection:
 
         except client_exceptions.InvalidURL as err:
             raise BadControllerUrl(err) from err
+        except asyncio.TimeoutError as err:
+            raise RequestTimeout("Request timed out") from err
         except client_exceptions.ClientConnectionError as err:
             raise ConnectionFailed(err) from err
         except client_exceptions.ClientError as err:
             raise RequestFailed(0, f"Unexpected error: {err}") from None
 
+    def _request_timeout(self, url: str, download: bool) -> tuple[ClientTimeout, bool]:
+        """
+        Get the timeout for a request, bounded by the time left before any deadline, and whether it
+        was the deadline that set the limit.
+        """
+        timeouts = self._timeouts
+        if download:
+            timeout = timeouts.download
+        else:
+            timeout = match_endpoint_policy(
+                timeouts.endpoints, parse_endpoint(url)[1], timeouts.default
+            )
+
+        deadline_bound = False
+        remaining = remaining_time()
+        if remaining is not None:
+            if remaining <= 0:
+                raise DeadlineExceeded("Operation deadline exceeded")
+            if timeout is None or remaining <= timeout:
+                timeout = remaining
+                deadline_bound = True
+
+        return ClientTimeout(total=timeout), deadline_bound
+
+    def _request_slot(self, url: str):
+        """Context to hold while a request is in flight, to limit concurrency."""
+        if self._concurrency_limiter is None:
+            return nullcontext()
+        return self._concurrency_limiter.slot(endpoint_template(url))
+
+    @asynccontextmanager
+    async def _request_context(
+        self, method: str, url: str, deadline_bound: bool
+    ) -> AsyncIterator[RequestRecord | None]:
+        """Context to hold while a request is in flight, to limit concurrency and measure the request."""
+        async with self._request_slot(url), _deadline_timeouts(deadline_bound):
+            instrumentation = self._instrumentation
+            budgets = active_budgets()
+            span = start_request_span(method, url, _request_attempt.get())
+            debug = _LOGGER.isEnabledFor(logging.DEBUG)
+            if instrumentation is None and not budgets and span is None and not debug:
+                yield None
+                return
+
+            record = RequestRecord.start(method, url)
+            try:
+                yield record
+            except BaseException as err:
+                record.finish(err)
+                raise
+            else:
+                record.finish()
+            finally:
+                if instrumentation is not None:
+                    instrumentation.report_request(record)
+                for budget in budgets:
+                    budget.add(record)
+                if span is not None:
+                    end_request_span(span, record)
+                if debug:
+                    _log_request(record)
+
+    def _record_event(self, event: ConnectionEvent) -> None:
+        if self._instrumentation is not None:
+            self._instrumentation.record_event(event)
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug(
+                "Connection event %s%s",
+                event.kind,
+                "".join(
+                    f" {name}={value}"
+                    for name, value in (
+                        ("attempt", event.attempt),
+                        ("delay", event.delay),
+                        ("error", event.error),
+                    )
+                    if value is not None
+                ),
+                extra={
+                    "omada_event": event.kind,
+                    "omada_attempt": event.attempt,
+                    "omada_delay": event.delay,
+                    "omada_error": event.error,
+                },
+            )
+
+    async def _read_json(
+        self, response: ClientResponse, trace: RequestRecord | None
+    ) -> Any:
+        """Decode a JSON response body."""
+        body = await response.read()
+        if trace is not None:
+            trace.bytes_received = len(body)
+        if not body.strip():
+            return None
+        return self._json_codec.loads(body)
+
     def _check_application_errors(self, response):
         if not isinstance(response, dict):
             return
@@ -276,16 +974,21 @@ class OmadaApiConnection:
     ) -> str:
         """Perform a request specific to the controlller, with authentication"""
 
-        if not await self._check_login():
-            await self.login()
-
-        return await self._do_request_download(
+        return await self._with_retries(
             method,
-            url,
-            params=params,
-            json=json,
-            data=data,
-            path=path,
+            True,
+            self._guard_request(
+                lambda: self._request_with_session(
+                    lambda: self._do_request_download(
+                        method,
+                        url,
+                        params=params,
+                        json=json,
+                        data=data,
+                        path=path,
+                    )
+                )
+            ),
         )
 
     async def _do_request_download(
@@ -308,20 +1011,28 @@ class OmadaApiConnection:
             headers["Omada-Request-Source"] = "web-local"
             headers["Referer"] = self._url + "/"
             headers["Origin"] = self._url
+        if json is not None:
+            data = self._json_codec.dumps(json)
+            headers["Content-Type"] = "application/json"
+        timeout, deadline_bound = self._request_timeout(url, download=True)
 
         try:
-            async with session.request(
+            async with self._request_context(method, url, deadline_bound) as trace, session.request(
                 method,
                 url,
                 params=params,
                 headers=headers,
-                json=json,
                 data=data,
                 ssl=self._verify_ssl,
+                timeout=timeout,
+                trace_request_ctx=trace,
             ) as response:
+                if trace is not None:
+                    trace.status = response.status
+                    trace.bytes_sent = _body_size(data)
                 if response.status != 200:
                     if response.content_type == "application/json":
-                        content = await response.json(encoding="utf-8")
+                        content = await self._read_json(response, trace)
                         self._check_application_errors(content)
 
                     raise RequestFailed(response.status, "HTTP Request Error")
@@ -354,10 +1065,14 @@ class OmadaApiConnection:
                         if not chunk:
                             break
                         await f.write(chunk)
+                        if trace is not None:
+                            trace.bytes_received += len(chunk)
                 return filepath
 
         except client_exceptions.InvalidURL as err:
             raise BadControllerUrl(err) from err
+        except asyncio.TimeoutError as err:
+            raise RequestTimeout("Request timed out") from err
         except client_exceptions.ClientConnectionError as err:
             raise ConnectionFailed(err) from err
         except client_exceptions.ClientError as err:
@@ -8,7 +8,19 @@ from awesomeversion import AwesomeVersion
 from multidict import CIMultiDict
 
 from .omadasiteclient import OmadaSiteClient
-from .omadaapiconnection import OmadaApiConnection
+from .omadaapiconnection import (
+    ConnectionPoolSettings,
+    OmadaApiConnection,
+    RequestTimeouts,
+    RetryPolicy,
+)
+from .circuitbreaker import CircuitBreaker
+from .hedging import RequestHedger
+from .instrumentation import RequestInstrumentation
+from .jsoncodec import JsonCodec
+from .limiter import AdaptiveConcurrencyLimiter
+from .responsecache import OmadaResponseCache
+from .tracing import traced
 
 
 from .exceptions import (
@@ -26,12 +38,16 @@ class OmadaSite(NamedTuple):
     id: str
 
 
+@traced
 class OmadaClient:
     """
     Simple client for Omada controller API
 
     Provides a very limited subset of the API documented in the
     'Omada_SDN_Controller_V5.0.15 API Document'
+
+    If OpenTelemetry is installed and a tracer provider is configured, each call to a public method of the
+    client or a site client is traced as a span, with a child span for every HTTP request it makes.
     """
 
     def __init__(
@@ -41,8 +57,38 @@ class OmadaClient:
         password: str,
         websession: ClientSession | None = None,
         verify_ssl=True,
+        optimistic_login=False,
+        keepalive=False,
+        deduplicate_requests=False,
+        cache: OmadaResponseCache | None = None,
+        json_codec: JsonCodec | None = None,
+        pool_settings: ConnectionPoolSettings | None = None,
+        retry_policy: RetryPolicy | None = None,
+        concurrency_limiter: AdaptiveConcurrencyLimiter | None = None,
+        timeouts: RequestTimeouts | None = None,
+        hedger: RequestHedger | None = None,
+        circuit_breaker: CircuitBreaker | None = None,
+        instrumentation: RequestInstrumentation | None = None,
     ):
-        self._api = OmadaApiConnection(url, username, password, websession, verify_ssl)
+        self._api = OmadaApiConnection(
+            url,
+            username,
+            password,
+            websession,
+            verify_ssl,
+            optimistic_login=optimistic_login,
+            keepalive=keepalive,
+            deduplicate_requests=deduplicate_requests,
+            cache=cache,
+            json_codec=json_codec,
+            pool_settings=pool_settings,
+            retry_policy=retry_policy,
+            concurrency_limiter=concurrency_limiter,
+            timeouts=timeouts,
+            hedger=hedger,
+            circuit_breaker=circuit_breaker,
+            instrumentation=instrumentation,
+        )
 
     async def __aenter__(self):
         await self._api.__aenter__()
@@ -1,6 +1,6 @@
 """Client for Omada Site requests."""
 
-from typing import AsyncIterable, List, Dict
+from typing import Any, AsyncIterable, Awaitable, Callable, Iterable, List, Dict, Mapping, TypeVar
 import time
 from uuid import uuid4
 import asyncio
@@ -42,10 +42,15 @@ from .devices import (
     OmadaAccesPointLanPortSettings,
 )
 from .setting.wan_lan_port import WanLanPort, WanPort
+from .deviceregistry import DeviceRegistry
 from .exceptions import (
+    DeviceDetailsFailed,
     InvalidDevice,
+    OmadaClientException,
+    PortUpdatesFailed,
 )
 from .omadaapiconnection import OmadaApiConnection
+from .portprofiles import PortProfileIndex
 from .setting.network import OmadaNetwork
 from .setting.ip_mac_binding import InterfaceType, IpMacBinding
 from .setting.group import create_group_from_map, Group
@@ -53,7 +58,9 @@ from .setting.rule import Rule, RuleType
 from .setting.ssid import Ssids
 from .setting.acl import Acl, AclType
 from .setting.packet_capture import PacketCaptureSource, PacketCaptureInterface, Filter
+from .tracing import traced
 
+_D = TypeVar("_D")
 
 @dataclass
 class PortProfileOverrides:
@@ -156,12 +163,25 @@ class OmadaClientSettings:
         return OmadaClientFixedAddress()
 
 
+@traced
 class OmadaSiteClient:
     """Client for querying an Omada site's devices."""
 
     def __init__(self, site_id: str, api: OmadaApiConnection):
         self._api = api
         self._site_id = site_id
+        self._device_registry = DeviceRegistry(self._fetch_devices)
+        self._port_profile_index = PortProfileIndex(self._fetch_port_profiles)
+
+    @property
+    def device_registry(self) -> DeviceRegistry:
+        """Index of the site's devices, used to look up devices by MAC address or name."""
+        return self._device_registry
+
+    @property
+    def port_profile_index(self) -> PortProfileIndex:
+        """Index of the site's port profiles, used to look up profiles by ID."""
+        return self._port_profile_index
 
     async def block_client(self, mac_or_client: str | OmadaNetworkClient) -> None:
         """Block the specified client from the network."""
@@ -250,10 +270,19 @@ class OmadaSiteClient:
         else:
             return OmadaWiredClientDetails(result)
 
-    async def get_connected_clients(self) -> AsyncIterable[OmadaConnectedClient]:
-        """Get the clients connected to the site network."""
+    async def get_connected_clients(
+        self, page_size: int = 100, concurrency: int = 1
+    ) -> AsyncIterable[OmadaConnectedClient]:
+        """
+        Get the clients connected to the site network.
+
+        Set concurrency greater than 1 to fetch pages of clients concurrently on large sites.
+        """
         async for client in self._api.iterate_pages(
-            self._api.format_url("clients", self._site_id), {"filters.active": "false"}
+            self._api.format_url("clients", self._site_id),
+            {"filters.active": "false"},
+            page_size=page_size,
+            concurrency=concurrency,
         ):
             is_wireless = client.get("wireless")
             if is_wireless:
@@ -261,10 +290,18 @@ class OmadaSiteClient:
             elif is_wireless is False:
                 yield OmadaWiredClient(client)
 
-    async def get_known_clients(self) -> AsyncIterable[OmadaNetworkClient]:
-        """Get the clients connected to the site network."""
+    async def get_known_clients(
+        self, page_size: int = 100, concurrency: int = 1
+    ) -> AsyncIterable[OmadaNetworkClient]:
+        """
+        Get the clients connected to the site network.
+
+        Set concurrency greater than 1 to fetch pages of clients concurrently on large sites.
+        """
         async for client in self._api.iterate_pages(
-            self._api.format_url("insight/clients", self._site_id)
+            self._api.format_url("insight/clients", self._site_id),
+            page_size=page_size,
+            concurrency=concurrency,
         ):
             is_wireless = client.get("wireless")
             if is_wireless:
@@ -274,7 +311,11 @@ class OmadaSiteClient:
 
     async def get_devices(self) -> list[OmadaListDevice]:
         """Get the list of devices on the site."""
+        devices = await self._fetch_devices()
+        self._device_registry.update(devices)
+        return devices
 
+    async def _fetch_devices(self) -> list[OmadaListDevice]:
         result = await self._api.request(
             "get", self._api.format_url("devices", self._site_id)
         )
@@ -282,27 +323,58 @@ class OmadaSiteClient:
         return [OmadaListDevice(d) for d in result]
 
     async def get_device(self, mac: str) -> OmadaListDevice:
-        """Get a single device by mac."""
-        # So wasteful
-        return next(d for d in await self.get_devices() if d.mac == mac)
+        """
+        Get a single device by mac.
 
-    async def get_switches(self) -> list[OmadaSwitch]:
-        """Get the list of switches on the site."""
+        The device comes from the site's device registry, so its status may be up to 30 seconds old.
+        """
+        return await self._device_registry.get(mac)
 
-        return [
-            await self.get_switch(d)
-            for d in await self.get_devices()
-            if d.type == "switch"
-        ]
+    async def find_device(self, mac_or_name: str) -> OmadaListDevice:
+        """Get a single device by mac or name, from the site's device registry."""
+        return await self._device_registry.find(mac_or_name)
 
-    async def get_access_points(self) -> list[OmadaAccessPoint]:
-        """Get the list of access points on the site."""
+    async def get_switches(self, concurrency: int = 8) -> list[OmadaSwitch]:
+        """
+        Get the list of switches on the site.
 
-        return [
-            await self.get_access_point(d)
-            for d in await self.get_devices()
-            if d.type == "ap"
-        ]
+        Details are fetched for up to `concurrency` switches at a time. If some fail, DeviceDetailsFailed
+        is raised once the rest have been fetched.
+        """
+        return await self._get_device_details("switch", self.get_switch, concurrency)
+
+    async def get_access_points(self, concurrency: int = 8) -> list[OmadaAccessPoint]:
+        """
+        Get the list of access points on the site.
+
+        Details are fetched for up to `concurrency` access points at a time. If some fail,
+        DeviceDetailsFailed is raised once the rest have been fetched.
+        """
+        return await self._get_device_details("ap", self.get_access_point, concurrency)
+
+    async def _get_device_details(
+        self,
+        device_type: str,
+        get_details: Callable[[OmadaListDevice], Awaitable[_D]],
+        concurrency: int,
+    ) -> list[_D]:
+        """Get the details of each device of a type, concurrently, in the order of the device list."""
+        devices = [d for d in await self.get_devices() if d.type == device_type]
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def fetch(device: OmadaListDevice) -> _D:
+            async with semaphore:
+                return await get_details(device)
+
+        outcomes = await asyncio.gather(
+            *(fetch(d) for d in devices), return_exceptions=True
+        )
+
+        errors = _collect_failures([d.mac for d in devices], outcomes)
+        results: list[_D] = [o for d, o in zip(devices, outcomes) if d.mac not in errors]
+        if errors:
+            raise DeviceDetailsFailed(results, errors)
+        return results
 
     async def get_access_point(
         self, mac_or_device: str | OmadaDevice
@@ -401,7 +473,14 @@ class OmadaSiteClient:
         """Return the current override settings for the port of a switch, or the current profile settings as default."""
 
         port = await self.get_switch_port(mac_or_device, index_or_port)
+        profile = None if port.has_profile_override else await self.get_port_profile(port.profile_id)
+        return self._switch_port_overrides(port, profile)
 
+    @staticmethod
+    def _switch_port_overrides(
+        port: OmadaSwitchPortDetails, profile: OmadaPortProfile | None
+    ) -> PortProfileOverrides:
+        """The override settings of a port, or the settings of its profile if it has no overrides."""
         result = PortProfileOverrides()
 
         # Return the current settings based on the overrides if they exist
@@ -424,7 +503,7 @@ class OmadaSiteClient:
             return result
 
         # Otherwise the profile's config values are used to augment the port settings
-        prof = await self.get_port_profile(port.profile_id)
+        prof = profile
 
         poe_mode = prof.poe_mode != PoEMode.DISABLED
 
@@ -454,27 +533,78 @@ class OmadaSiteClient:
         # Get the latest representation of the acccess point
         access_point = await self.get_access_point(mac_or_device)
 
-        port_settings = [
-            {
-                "id": port_name,
-                "lanPort": port_name,
-                "localVlanEnable": (
-                    setting.vlan_enable
-                    if setting.vlan_enable is not None
-                    else ps.local_vlan_enable
-                ),
-                "localVlanId": (
-                    setting.vlan_id if setting.vlan_id is not None else ps.local_vlan_id
-                ),
-                "poeOutEnable": (
-                    setting.enable_poe
-                    if setting.enable_poe is not None and ps.supports_poe
-                    else ps.poe_enable
-                ),
-            }
-            for ps in access_point.lan_port_settings
-            if ps.port_name == port_name
-        ]
+        updated_ap = await self._update_access_point_ports(access_point, {port_name: setting})
+        # The caller probably only cares about the updated port status
+        return next(p for p in updated_ap.lan_port_settings if p.port_name == port_name)
+
+    async def update_access_point_ports(
+        self,
+        updates: Mapping[str | OmadaDevice, Mapping[str, AccessPointPortSettings]],
+        concurrency: int = 8,
+    ) -> list[OmadaAccessPoint]:
+        """
+        Update several lan ports on each of several access points, given the new settings by port name.
+
+        Each access point is updated with a single request, and up to `concurrency` access points are
+        updated at a time. Access points given as `OmadaAccessPoint` objects, such as those from
+        `get_access_points()`, are updated from those objects without being fetched again. Returns the
+        updated access points, in the order given.
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def update(
+            mac_or_device: str | OmadaDevice, port_settings: Mapping[str, AccessPointPortSettings]
+        ) -> OmadaAccessPoint:
+            async with semaphore:
+                if isinstance(mac_or_device, OmadaAccessPoint):
+                    access_point = mac_or_device
+                else:
+                    access_point = await self.get_access_point(mac_or_device)
+                return await self._update_access_point_ports(access_point, port_settings)
+
+        macs = [d.mac if isinstance(d, OmadaDevice) else d for d in updates]
+        outcomes = await asyncio.gather(
+            *(update(d, s) for d, s in updates.items()), return_exceptions=True
+        )
+        errors = _collect_failures(macs, outcomes)
+        results = [o for mac, o in zip(macs, outcomes) if mac not in errors]
+        if errors:
+            raise PortUpdatesFailed(results, errors)
+        return results
+
+    async def _update_access_point_ports(
+        self,
+        access_point: OmadaAccessPoint,
+        settings: Mapping[str, AccessPointPortSettings],
+    ) -> OmadaAccessPoint:
+        """Send the new settings of an access point's lan ports in a single request."""
+        ports = {ps.port_name: ps for ps in access_point.lan_port_settings}
+        missing = [name for name in settings if name not in ports]
+        if missing:
+            raise InvalidDevice(f"Access point {access_point.mac} has no port {', '.join(missing)}")
+
+        port_settings = []
+        for port_name, setting in settings.items():
+            ps = ports[port_name]
+            port_settings.append(
+                {
+                    "id": port_name,
+                    "lanPort": port_name,
+                    "localVlanEnable": (
+                        setting.vlan_enable
+                        if setting.vlan_enable is not None
+                        else ps.local_vlan_enable
+                    ),
+                    "localVlanId": (
+                        setting.vlan_id if setting.vlan_id is not None else ps.local_vlan_id
+                    ),
+                    "poeOutEnable": (
+                        setting.enable_poe
+                        if setting.enable_poe is not None and ps.supports_poe
+                        else ps.poe_enable
+                    ),
+                }
+            )
 
         payload = {"lanPortSettings": port_settings}
 
@@ -484,9 +614,7 @@ class OmadaSiteClient:
             json=payload,
         )
 
-        updated_ap = OmadaAccessPoint(result)
-        # The caller probably only cares about the updated port status
-        return next(p for p in updated_ap.lan_port_settings if p.port_name == port_name)
+        return OmadaAccessPoint(result)
 
     async def update_switch_port(
         self,
@@ -508,11 +636,112 @@ class OmadaSiteClient:
         else:
             port = await self.get_switch_port(mac_or_device, index_or_port)
 
-        override_setting = (
+        existing_overrides = None
+        if self._overrides_enabled(port, settings):
+            existing_overrides = await self.get_switch_port_overrides(mac, port)
+
+        version = await self._api.get_controller_version()
+        await self._api.request(
+            "patch",
+            self._switch_port_url(mac, port.port, version),
+            json=self._switch_port_payload(port, settings, existing_overrides, version),
+        )
+
+        # Read back the new port settings
+        return await self.get_switch_port(mac, port)
+
+    async def update_switch_ports(
+        self,
+        mac_or_device: str | OmadaDevice,
+        settings: Mapping[int | OmadaSwitchPort, SwitchPortSettings],
+        concurrency: int = 8,
+    ) -> list[OmadaSwitchPortDetails]:
+        """
+        Update several ports of a switch, given the new settings of each port.
+
+        The switch's ports, and the profiles they use, are read once. Up to `concurrency` port updates
+        are then sent at a time, and the ports are read back once at the end. Returns the new details
+        of the updated ports, in port order.
+        """
+
+        if isinstance(mac_or_device, OmadaDevice):
+            if mac_or_device.type != "switch":
+                raise InvalidDevice()
+            mac = mac_or_device.mac
+        else:
+            mac = mac_or_device
+
+        port_settings = {
+            (p.port if isinstance(p, OmadaSwitchPort) else p): s
+            for p, s in settings.items()
+        }
+        ports = {p.port: p for p in await self.get_switch_ports(mac)}
+        missing = [str(n) for n in port_settings if n not in ports]
+        if missing:
+            raise InvalidDevice(f"Switch {mac} has no port {', '.join(missing)}")
+
+        overridden = [n for n, s in port_settings.items() if self._overrides_enabled(ports[n], s)]
+        profiles = await self.get_port_profiles_by_id(
+            {ports[n].profile_id for n in overridden if not ports[n].has_profile_override}
+        )
+        version = await self._api.get_controller_version()
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def update(number: int, new_settings: SwitchPortSettings) -> None:
+            port = ports[number]
+            existing_overrides = None
+            if number in overridden:
+                existing_overrides = self._switch_port_overrides(port, profiles.get(port.profile_id))
+            payload = self._switch_port_payload(port, new_settings, existing_overrides, version)
+            async with semaphore:
+                await self._api.request(
+                    "patch", self._switch_port_url(mac, number, version), json=payload
+                )
+
+        outcomes = await asyncio.gather(
+            *(update(n, s) for n, s in port_settings.items()), return_exceptions=True
+        )
+        errors = _collect_failures(list(port_settings), outcomes)
+
+        # Read back the new port settings
+        results = [
+            p
+            for p in await self.get_switch_ports(mac)
+            if p.port in port_settings and p.port not in errors
+        ]
+        if errors:
+            raise PortUpdatesFailed(results, errors)
+        return results
+
+    @staticmethod
+    def _overrides_enabled(port: OmadaSwitchPort, settings: SwitchPortSettings) -> bool:
+        """True if the port will override its profile's settings once updated."""
+        return (
             settings.profile_override_enabled
             if settings.profile_override_enabled is not None
             else port.has_profile_override
         )
+
+    def _switch_port_url(self, mac: str, port: int, version: AwesomeVersion) -> str:
+        """The URL for updating a switch port, which depends on the controller version."""
+        if version < AwesomeVersion("6"):
+            return self._api.format_url(f"switches/{mac}/ports/{port}", self._site_id)
+        # New OpenAPI endpoint from 6.0+
+        return self._api.format_openapi_url(f"switches/{mac}/ports/{port}", self._site_id)
+
+    @staticmethod
+    def _switch_port_payload(
+        port: OmadaSwitchPort,
+        settings: SwitchPortSettings,
+        existing_overrides: PortProfileOverrides | None,
+        version: AwesomeVersion,
+    ) -> dict[str, Any]:
+        """
+        Build the update request for a port, from its current state and the new settings.
+
+        `existing_overrides` are required if the port will override its profile's settings.
+        """
+        override_setting = existing_overrides is not None
         payload = {
             "name": settings.name or port.name,
             "profileId": settings.profile_id or port.profile_id,
@@ -566,8 +795,7 @@ class OmadaSiteClient:
                     else port.voice_network_id
                 )
 
-        if override_setting:
-            existing_overrides = await self.get_switch_port_overrides(mac, port)
+        if existing_overrides is not None:
             new_overrides = settings.profile_overrides or PortProfileOverrides()
 
             # Hacks
@@ -605,7 +833,7 @@ class OmadaSiteClient:
                 if new_overrides.port_isolation is not None
                 else existing_overrides.port_isolation
             )
-            if (await self._api.get_controller_version()) < AwesomeVersion("6"):
+            if version < AwesomeVersion("6"):
                 # Possibly no longer valid
                 payload["topoNotifyEnable"] = False
             else:
@@ -634,38 +862,29 @@ class OmadaSiteClient:
 
                 payload["dhcpL2RelaySettings"] = {"enable": False}
 
-        if (await self._api.get_controller_version()) < AwesomeVersion("6"):
-            request_url = self._api.format_url(
-                f"switches/{mac}/ports/{port.port}", self._site_id
-            )
-        else:
-            # New OpenAPI endpoint from 6.0+
-            request_url = self._api.format_openapi_url(
-                f"switches/{mac}/ports/{port.port}", self._site_id
-            )
-
-        await self._api.request(
-            "patch",
-            request_url,
-            json=payload,
-        )
-
-        # Read back the new port settings
-        return await self.get_switch_port(mac, port)
+        return payload
 
     async def get_port_profile(self, profile_id: str) -> OmadaPortProfile:
-        """Get the details of a port profile by ID."""
-        profiles = await self.get_port_profiles()
+        """Get the details of a port profile by ID, from the site's port profile index."""
+        return await self._port_profile_index.get(profile_id)
 
-        profile = next((p for p in profiles if p.profile_id == profile_id), None)
+    async def get_port_profiles_by_id(
+        self, profile_ids: Iterable[str]
+    ) -> dict[str, OmadaPortProfile]:
+        """Get the details of several port profiles by ID, with at most one request."""
+        return await self._port_profile_index.get_many(profile_ids)
 
-        if not profile:
-            raise InvalidDevice(f"Port profile {profile_id} does not exist")
-        return profile
+    def invalidate_port_profiles(self) -> None:
+        """Forget the cached port profiles, for example after they are edited outside this client."""
+        self._port_profile_index.invalidate()
 
     async def get_port_profiles(self) -> list[OmadaPortProfile]:
         """Lists the available switch port profiles that can be applied."""
+        profiles = await self._fetch_port_profiles()
+        self._port_profile_index.update(profiles)
+        return profiles
 
+    async def _fetch_port_profiles(self) -> list[OmadaPortProfile]:
         result = await self._api.request(
             "get", self._api.format_url("setting/lan/profileSummary", self._site_id)
         )
@@ -705,22 +924,20 @@ class OmadaSiteClient:
 
         return True
 
-    async def get_gateways(self) -> list[OmadaGateway]:
-        """Get the list of gateways (routers) on the site. (Zero or one!)"""
+    async def get_gateways(self, concurrency: int = 8) -> list[OmadaGateway]:
+        """
+        Get the list of gateways (routers) on the site. (Zero or one!)
 
-        return [
-            await self.get_gateway(d)
-            for d in await self.get_devices()
-            if d.type == "gateway"
-        ]
+        If some fail, DeviceDetailsFailed is raised once the rest have been fetched.
+        """
+        return await self._get_device_details("gateway", self.get_gateway, concurrency)
 
     async def _get_gateway_mac(self, mac_or_device: str | OmadaDevice | None) -> str:
         if mac_or_device is None:
-            mac_or_device = next(
-                (d for d in await self.get_devices() if d.type == "gateway"), None
-            )
-            if mac_or_device is None:
+            gateways = await self._device_registry.of_type("gateway")
+            if not gateways:
                 raise InvalidDevice("No gateways found in site")
+            mac_or_device = gateways[0]
 
         if isinstance(mac_or_device, OmadaDevice):
             if mac_or_device.type != "gateway":
@@ -1156,3 +1373,18 @@ class OmadaSiteClient:
         )
 
         return downloaded
+
+
+def _collect_failures(keys: list, outcomes: list) -> dict[Any, OmadaClientException]:
+    """
+    Pair the outcomes of a gather(return_exceptions=True) with their keys, keeping the client errors.
+
+    Any other exception is re-raised, as it indicates a bug rather than a failed request.
+    """
+    errors = {}
+    for key, outcome in zip(keys, outcomes):
+        if isinstance(outcome, OmadaClientException):
+            errors[key] = outcome
+        elif isinstance(outcome, BaseException):
+            raise outcome
+    return errors
@@ -0,0 +1,48 @@
+"""Index of a site's switch port profiles."""
+
+from typing import Awaitable, Callable, Iterable
+
+from .devices import OmadaPortProfile
+from .exceptions import InvalidDevice
+from .snapshot import RefreshableSnapshot
+
+
+class PortProfileIndex(RefreshableSnapshot[list[OmadaPortProfile]]):
+    """
+    The port profiles of a site, indexed by ID.
+
+    Profiles rarely change, so the profile list is only downloaded again when it is older than `ttl`
+    seconds, when a profile can't be found, or after `invalidate()`.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], Awaitable[list[OmadaPortProfile]]],
+        ttl: float = 300,
+    ):
+        super().__init__(fetch, ttl)
+        self._by_id: dict[str, OmadaPortProfile] = {}
+
+    @property
+    def profiles(self) -> list[OmadaPortProfile]:
+        """All the profiles currently known, without refreshing."""
+        return list(self._by_id.values())
+
+    def _store(self, data: list[OmadaPortProfile]) -> None:
+        self._by_id = {p.profile_id: p for p in data}
+
+    async def get(self, profile_id: str) -> OmadaPortProfile:
+        """Get a profile by ID."""
+        return (await self.get_many([profile_id]))[profile_id]
+
+    async def get_many(self, profile_ids: Iterable[str]) -> dict[str, OmadaPortProfile]:
+        """Get several profiles by ID, downloading the profile list at most once."""
+        wanted = set(profile_ids)
+        if self.is_stale or not wanted.issubset(self._by_id):
+            # A missing profile may have been created since we last looked
+            await self.refresh()
+
+        missing = wanted.difference(self._by_id)
+        if missing:
+            raise InvalidDevice(f"Port profile {', '.join(sorted(missing))} does not exist")
+        return {profile_id: self._by_id[profile_id] for profile_id in wanted}
@@ -0,0 +1,150 @@
+"""Optional cache for controller responses."""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+import time
+from typing import Any
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from .endpoints import match_endpoint_policy, parse_endpoint
+
+# Default time to live (in seconds) for endpoint families.
+# Endpoints are relative to the site, and match any endpoint below them.
+DEFAULT_CACHE_POLICY: dict[str, float] = {
+    "setting/lan/profileSummary": 300,
+    "setting/lan/networks": 300,
+    "devices": 5,
+    "switches": 5,
+    "eaps": 5,
+    "gateways": 5,
+}
+
+# Query parameters the API uses to defeat HTTP caching, which shouldn't be part of the cache key
+_CACHE_BUSTER_PARAMS: frozenset[str] = frozenset({"_", "_t", "cu_t"})
+
+
+@dataclass
+class CacheStats:
+    """Counters for tuning the response cache."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+
+
+class OmadaResponseCache:
+    """
+    Bounded LRU cache of GET responses, with a time to live for each endpoint family.
+
+    Endpoints without a policy (such as clients) are never cached. Any request that modifies the
+    controller's state invalidates all cached entries for the same site.
+
+    Cached responses are shared between callers, and must not be modified.
+    """
+
+    def __init__(
+        self, policy: dict[str, float] | None = None, max_entries: int = 1024
+    ):
+        self._policy = dict(DEFAULT_CACHE_POLICY if policy is None else policy)
+        self._max_entries = max_entries
+        self._entries: OrderedDict[tuple, tuple[float, str | None, Any]] = (
+            OrderedDict()
+        )
+        self._generation = 0
+        self._stats = CacheStats()
+
+    @property
+    def stats(self) -> CacheStats:
+        """Hit, miss, eviction and invalidation counters."""
+        return self._stats
+
+    @property
+    def generation(self) -> int:
+        """Changes whenever entries are invalidated, so responses to requests made before can be discarded."""
+        return self._generation
+
+    def ttl_for(self, endpoint: str) -> float:
+        """Get the time to live for an endpoint, from the most specific policy that matches it."""
+        return match_endpoint_policy(self._policy, endpoint, 0.0)
+
+    def is_cacheable(self, url: str) -> bool:
+        """True if responses from this url should be cached."""
+        _, endpoint = parse_endpoint(url)
+        return self.ttl_for(endpoint) > 0
+
+    def get(self, url: str, params: dict[str, Any] | None) -> tuple[bool, Any]:
+        """Look up a cached response. Returns whether it was found, and the response."""
+        key = self._make_key(url, params)
+        entry = self._entries.get(key)
+        if entry is None:
+            self._stats.misses += 1
+            return (False, None)
+
+        expires, _, value = entry
+        if expires < time.monotonic():
+            del self._entries[key]
+            self._stats.misses += 1
+            return (False, None)
+
+        self._entries.move_to_end(key)
+        self._stats.hits += 1
+        return (True, value)
+
+    def put(
+        self,
+        url: str,
+        params: dict[str, Any] | None,
+        value: Any,
+        generation: int | None = None,
+    ) -> None:
+        """
+        Store a response.
+
+        If `generation` is given, the response is discarded if the cache was invalidated since then.
+        """
+        if generation is not None and generation != self._generation:
+            return
+        site, endpoint = parse_endpoint(url)
+        ttl = self.ttl_for(endpoint)
+        if ttl <= 0:
+            return
+
+        key = self._make_key(url, params)
+        self._entries[key] = (time.monotonic() + ttl, site, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self._stats.evictions += 1
+
+    def invalidate(self, url: str | None = None) -> None:
+        """Invalidate the entries affected by a change to `url`, or all entries."""
+        self._generation += 1
+        site = parse_endpoint(url)[0] if url is not None else None
+        if site is None:
+            self._stats.invalidations += len(self._entries)
+            self._entries.clear()
+            return
+
+        stale = [key for key, entry in self._entries.items() if entry[1] == site]
+        for key in stale:
+            del self._entries[key]
+        self._stats.invalidations += len(stale)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self.invalidate()
+
+    @staticmethod
+    def _make_key(url: str, params: dict[str, Any] | None) -> tuple:
+        url_parts = urlsplit(url)
+        query = [
+            (k, v)
+            for k, v in parse_qsl(url_parts.query)
+            if k not in _CACHE_BUSTER_PARAMS
+        ]
+        if params:
+            query.extend(
+                (k, str(v)) for k, v in params.items() if k not in _CACHE_BUSTER_PARAMS
+            )
+        return (url_parts.path, urlencode(sorted(query)))
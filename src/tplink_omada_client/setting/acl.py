@@ -62,13 +62,6 @@ class Protocol(Enum):
         return [Protocol(value) for value in values]
 
     def to_values(protocols: List["Protocol"]) -> List[int]:
-        print(
-            "protocols:",
-            protocols,
-            len(protocols),
-            len([protocol for protocol in Protocol]),
-            len(Protocol),
-        )
         return (
             [256]
             if len(protocols) >= len(Protocol)
@@ -36,11 +36,10 @@ class WanLanPort(ABC):
     def __init__(self, port_uuid: str, port_name: str):
         self._port_uuid = port_uuid
         self._port_name = port_name
-        print("port_name:", port_name)
         match = re.match(r"([^0-9]+)([0-9]+)$", self.port_name)
         if match is not None:
             self._port_type = PortType.from_str(match[1])
-            self._port_number = int(re.match(r"([^0-9]+)([0-9]+)$", self.port_name)[2])
+            self._port_number = int(match[2])
         else:
             self._port_type = PortType.from_str(port_name)
             self._port_number = 0
@@ -0,0 +1,49 @@
+"""Data downloaded from the controller, kept for a while before downloading it again."""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, Generic, TypeVar
+
+_T = TypeVar("_T")
+
+
+class RefreshableSnapshot(Generic[_T]):
+    """
+    A snapshot of data from the controller, which goes stale after `max_age` seconds.
+
+    Subclasses index the data in `_store`. `refresh` downloads the data again, with concurrent callers
+    sharing a single download.
+    """
+
+    def __init__(self, fetch: Callable[[], Awaitable[_T]], max_age: float):
+        self._fetch = fetch
+        self._max_age = max_age
+        self._updated: float | None = None
+        self._refresh_lock = asyncio.Lock()
+
+    @property
+    def is_stale(self) -> bool:
+        """True if the data should be downloaded again before use."""
+        return self._updated is None or time.monotonic() - self._updated > self._max_age
+
+    def update(self, data: _T) -> None:
+        """Replace the snapshot's contents with freshly downloaded data."""
+        self._store(data)
+        self._updated = time.monotonic()
+
+    def invalidate(self) -> None:
+        """Download the data again the next time it is used."""
+        self._updated = None
+
+    async def refresh(self) -> None:
+        """Download the data. Concurrent callers share a single download."""
+        updated = self._updated
+        async with self._refresh_lock:
+            if self._updated is not None and self._updated != updated:
+                # Someone else refreshed while we were waiting
+                return
+            self.update(await self._fetch())
+
+    def _store(self, data: _T) -> None:
+        """Index freshly downloaded data."""
+        raise NotImplementedError
@@ -0,0 +1,6 @@
+"""A local stand-in Omada controller, for testing and benchmarking without real hardware."""
+
+from .data import FakeSite, SiteSpec, generate_site
+from .server import FakeOmadaController
+
+__all__ = ["FakeOmadaController", "FakeSite", "SiteSpec", "generate_site"]
@@ -0,0 +1,316 @@
+"""Synthetic site data for the fake controller."""
+
+from dataclasses import dataclass, field
+import random
+import time
+from typing import Any
+
+from ..definitions import DeviceStatus, DeviceStatusCategory, LedSetting, PoEMode
+
+# Distinct OUIs per kind of MAC address, so generated addresses never collide
+_OUI = {"switch": "A8-42-A1", "ap": "60-83-E7", "gateway": "E4-C3-2A", "client": "3C-22-FB"}
+
+
+@dataclass
+class SiteSpec:
+    """The size and shape of a synthetic site."""
+
+    name: str = "Default"
+    switches: int = 2
+    access_points: int = 4
+    gateways: int = 1
+    clients: int = 50
+    # Known clients that aren't currently connected
+    disconnected_clients: int = 10
+    ports_per_switch: int = 24
+    # Proportion of connected clients that are wireless, if there are access points
+    wireless_ratio: float = 0.8
+    ssids: tuple[str, ...] = ("Home", "Guest")
+    seed: int = 0
+
+
+def mac_address(kind: str, site_index: int, index: int) -> str:
+    """A deterministic MAC address for a generated device or client."""
+    return f"{_OUI[kind]}-{site_index:02X}-{(index >> 8) & 0xFF:02X}-{index & 0xFF:02X}"
+
+
+@dataclass
+class FakeSite:
+    """The state of a site on the fake controller. Entries are API-format dicts, and can be edited by tests."""
+
+    site_id: str
+    name: str
+    devices: dict[str, dict[str, Any]] = field(default_factory=dict)
+    switches: dict[str, dict[str, Any]] = field(default_factory=dict)
+    # Port details of each switch, keyed by switch MAC and port number
+    switch_ports: dict[str, dict[int, dict[str, Any]]] = field(default_factory=dict)
+    access_points: dict[str, dict[str, Any]] = field(default_factory=dict)
+    gateways: dict[str, dict[str, Any]] = field(default_factory=dict)
+    clients: dict[str, dict[str, Any]] = field(default_factory=dict)
+    known_clients: dict[str, dict[str, Any]] = field(default_factory=dict)
+    port_profiles: list[dict[str, Any]] = field(default_factory=list)
+    networks: list[dict[str, Any]] = field(default_factory=list)
+    wan_lan_status: dict[str, Any] = field(default_factory=dict)
+
+    def switch_detail(self, mac: str) -> dict[str, Any]:
+        """The switch details, with a summary of its current ports."""
+        ports = [
+            {
+                key: port[key]
+                for key in ("port", "name", "profileId", "type", "operation", "disable", "portStatus")
+            }
+            for _, port in sorted(self.switch_ports[mac].items())
+        ]
+        return {**self.switches[mac], "ports": ports}
+
+
+def generate_site(spec: SiteSpec, site_index: int) -> FakeSite:
+    """Generate a site's devices, ports, clients and settings from a spec."""
+    rng = random.Random(f"{spec.seed}:{site_index}")
+    site = FakeSite(site_id=f"{site_index + 1:024x}", name=spec.name)
+    now_ms = int(time.time() * 1000)
+
+    site.port_profiles = [
+        _port_profile(site.site_id, 1, "All", PoEMode.ENABLED),
+        _port_profile(site.site_id, 2, "Disable", PoEMode.DISABLED),
+    ]
+    default_profile = site.port_profiles[0]
+    site.networks = [
+        {
+            "id": f"{site_index + 1:08x}{n:016x}",
+            "site": site.site_id,
+            "name": "LAN" if n == 0 else f"VLAN{n * 10}",
+            "purpose": "interface" if n == 0 else "vlan",
+            "interfaceIds": [],
+            "vlanType": 0,
+            "vlan": 1 if n == 0 else n * 10,
+            "gatewaySubnet": f"192.168.{n}.1/24",
+        }
+        for n in range(3)
+    ]
+
+    for index in range(spec.gateways):
+        mac = mac_address("gateway", site_index, index)
+        entry = _device_entry(rng, "gateway", mac, f"Gateway {index + 1}", "ER605", index)
+        site.devices[mac] = entry
+        site.gateways[mac] = {
+            **entry,
+            "ledSetting": LedSetting.SITE_SETTINGS,
+            "portNum": 5,
+            "supportPoe": False,
+            "lldpEnable": False,
+            "echoServer": "0.0.0.0",
+            "portStats": [_gateway_port_status(rng, port) for port in range(1, 6)],
+            "portConfigs": [
+                {"port": port, "duplex": 0, "linkSpeed": 0, "mirrorEnable": False,
+                 "portStat": _gateway_port_status(rng, port)}
+                for port in range(1, 6)
+            ],
+        }
+        site.wan_lan_status = {
+            "portName": {f"lan-{port}": f"LAN{port}" for port in range(2, 6)},
+            "wanList": [{"portUuid": "wan-1", "portName": "WAN1", "enable": 0, "type": 0}],
+        }
+
+    for index in range(spec.switches):
+        mac = mac_address("switch", site_index, index)
+        entry = _device_entry(rng, "switch", mac, f"Switch {index + 1}", "TL-SG3428XMP", index)
+        site.devices[mac] = entry
+        site.switches[mac] = {
+            **entry,
+            "ledSetting": LedSetting.SITE_SETTINGS,
+            "portNum": spec.ports_per_switch,
+            "devCap": {"poePortNum": spec.ports_per_switch, "poeSupport": True, "supportBt": False},
+            "uplink": None,
+            "downlinkList": [],
+        }
+        site.switch_ports[mac] = {
+            port: _switch_port(rng, mac, port, default_profile)
+            for port in range(1, spec.ports_per_switch + 1)
+        }
+
+    for index in range(spec.access_points):
+        mac = mac_address("ap", site_index, index)
+        entry = _device_entry(rng, "ap", mac, f"AP {index + 1}", "EAP650", index)
+        site.devices[mac] = entry
+        site.access_points[mac] = {
+            **entry,
+            "ledSetting": LedSetting.SITE_SETTINGS,
+            "wirelessLinked": False,
+            "deviceMisc": {"support5g": True, "support5g2": False, "support6g": False, "support11ac": True,
+                           "supportMesh": True},
+            "wiredUplink": None,
+            "lanPortSettings": [
+                {"id": f"ETH{port}", "lanPort": f"ETH{port}", "supportVlan": True, "localVlanEnable": False,
+                 "localVlanId": 1, "supportPoe": port == 2, "poeOutEnable": False}
+                for port in range(1, 3)
+            ],
+        }
+
+    ap_list = list(site.access_points.values())
+    switch_macs = list(site.switches)
+    for index in range(spec.clients + spec.disconnected_clients):
+        active = index < spec.clients
+        mac = mac_address("client", site_index, index)
+        client: dict[str, Any] = {
+            "mac": mac,
+            "name": f"client-{index}",
+            "hostName": f"client-{index}",
+            "ip": f"10.{site_index}.{index // 250}.{index % 250 + 2}",
+            "active": active,
+            "blocked": False,
+            "guest": False,
+            "uptime": rng.randint(60, 86400) if active else 0,
+            "lastSeen": now_ms - (0 if active else rng.randint(3600, 604800) * 1000),
+            "deviceType": "unknown",
+            "authStatus": 0,
+            "vid": 0,
+            "activity": rng.randint(0, 100000) if active else 0,
+            "trafficDown": rng.randint(0, 10**9),
+            "trafficUp": rng.randint(0, 10**8),
+            "downPacket": rng.randint(0, 10**6),
+            "upPacket": rng.randint(0, 10**6),
+            "ipSetting": {"useFixedAddr": False},
+            "rateLimit": {"enable": False},
+            "clientLockToApSetting": {"enable": False, "aps": []},
+        }
+        if ap_list and (not switch_macs or rng.random() < spec.wireless_ratio):
+            ap = ap_list[index % len(ap_list)]
+            client.update(
+                {
+                    "wireless": True,
+                    "connectType": 1,
+                    "connectDevType": "ap",
+                    "apMac": ap["mac"],
+                    "apName": ap["name"],
+                    "ssid": spec.ssids[index % len(spec.ssids)] if spec.ssids else "",
+                    "channel": rng.choice((1, 6, 11, 36, 44)),
+                    "radioId": rng.choice((0, 1)),
+                    "rssi": rng.randint(-80, -40),
+                    "signalLevel": rng.randint(20, 100),
+                    "signalRank": rng.randint(1, 5),
+                    "rxRate": rng.choice((72000, 144000, 866000)),
+                    "txRate": rng.choice((72000, 144000, 866000)),
+                    "wifiMode": 5,
+                    "powerSave": False,
+                }
+            )
+        else:
+            switch_mac = switch_macs[index % len(switch_macs)] if switch_macs else None
+            client.update(
+                {
+                    "wireless": False,
+                    "connectType": 2,
+                    "connectDevType": "switch" if switch_mac else "gateway",
+                    "switchMac": switch_mac,
+                    "switchName": site.switches[switch_mac]["name"] if switch_mac else None,
+                    "port": index % spec.ports_per_switch + 1 if switch_mac else 0,
+                    "networkName": "LAN",
+                    "dot1xVlan": 0,
+                }
+            )
+        site.known_clients[mac] = client
+        if active:
+            site.clients[mac] = client
+
+    return site
+
+
+def _device_entry(
+    rng: random.Random, device_type: str, mac: str, name: str, model: str, index: int
+) -> dict[str, Any]:
+    uptime = rng.randint(3600, 30 * 86400)
+    return {
+        "type": device_type,
+        "mac": mac,
+        "name": name,
+        "model": model,
+        "showModel": f"{model} v1.0",
+        "status": DeviceStatus.CONNECTED,
+        "statusCategory": DeviceStatusCategory.CONNECTED,
+        "ip": f"192.168.0.{index % 250 + 2}",
+        "cpuUtil": rng.randint(1, 60),
+        "memUtil": rng.randint(20, 80),
+        "uptime": f"{uptime // 86400}day(s) {uptime % 86400 // 3600}h",
+        "uptimeLong": uptime,
+        "firmwareVersion": "1.0.0 Build 20240101 Rel. 12345",
+        "needUpgrade": False,
+        "fwDownload": False,
+    }
+
+
+def _port_profile(site_id: str, index: int, name: str, poe: PoEMode) -> dict[str, Any]:
+    return {
+        "id": f"{site_id[:16]}{index:08x}",
+        "site": site_id,
+        "name": name,
+        "poe": poe,
+        "dot1x": 1,
+        "bandWidthCtrlType": 0,
+        "lldpMedEnable": True,
+        "topoNotifyEnable": False,
+        "spanningTreeEnable": False,
+        "loopbackDetectEnable": True,
+        "portIsolationEnable": False,
+        "eeeEnable": False,
+        "flowControlEnable": False,
+        "loopbackDetectVlanBasedEnable": False,
+    }
+
+
+def _switch_port(rng: random.Random, switch_mac: str, port: int, profile: dict[str, Any]) -> dict[str, Any]:
+    link_up = rng.random() < 0.6
+    poe_active = link_up and rng.random() < 0.3
+    return {
+        "id": f"{switch_mac.replace('-', '').lower()}{port:04d}",
+        "port": port,
+        "name": f"Port{port}",
+        "profileId": profile["id"],
+        "profileName": profile["name"],
+        "profileOverrideEnable": False,
+        "type": 1,
+        "operation": "switching",
+        "disable": False,
+        "maxSpeed": 3,
+        "linkSpeed": 0,
+        "duplex": 0,
+        "poe": PoEMode.ENABLED,
+        "supportPoe": True,
+        "dot1x": 1,
+        "bandWidthCtrlType": 0,
+        "lldpMedEnable": True,
+        "spanningTreeEnable": False,
+        "loopbackDetectEnable": True,
+        "portIsolationEnable": False,
+        "topoNotifyEnable": False,
+        "tagIds": [],
+        "networkTagsSetting": 0,
+        "portStatus": {
+            "linkStatus": 1 if link_up else 0,
+            "linkSpeed": 3 if link_up else 0,
+            "poe": poe_active,
+            "poePower": round(rng.uniform(1.5, 15.4), 1) if poe_active else 0.0,
+            "tx": rng.randint(0, 10**12) if link_up else 0,
+            "rx": rng.randint(0, 10**12) if link_up else 0,
+            "stpDiscarding": False,
+        },
+    }
+
+
+def _gateway_port_status(rng: random.Random, port: int) -> dict[str, Any]:
+    wan = port == 1
+    return {
+        "port": port,
+        "name": f"SFP WAN/LAN{port}" if port == 1 else f"WAN/LAN{port}",
+        "type": 0 if wan else 1,
+        "mode": 0 if wan else 1,
+        "status": 1,
+        "speed": 3,
+        "duplex": 2,
+        "poe": False,
+        "tx": rng.randint(0, 10**12),
+        "rx": rng.randint(0, 10**12),
+        "internetState": 1 if wan else 0,
+        "ip": "203.0.113.10" if wan else None,
+        "proto": "dhcp" if wan else None,
+    }
@@ -0,0 +1,358 @@
+"""A stand-in Omada controller, served by aiohttp."""
+
+import asyncio
+import json
+import re
+import secrets
+from typing import Any, Awaitable, Callable
+
+from aiohttp import web
+
+from ..endpoints import endpoint_template
+from .data import FakeSite, SiteSpec, generate_site
+
+_SESSION_COOKIE = "TPOMADA_SESSIONID"
+
+# Matches the controller's v2 API, and the OpenAPI used for some updates on 6.0+
+_API_PATH = re.compile(r"^/(?P<cid>[^/]+)/api/v2/(?P<path>.*)$")
+_OPENAPI_PATH = re.compile(r"^/openapi/v1/(?P<cid>[^/]+)/(?P<path>.*)$")
+_SITE_PATH = re.compile(r"^sites/(?P<site>[^/]+)/(?P<path>.*)$")
+
+_SiteHandler = Callable[[web.Request, FakeSite, re.Match, Any], Awaitable[Any]]
+
+
+class _ApiError(Exception):
+    """An error to return in the controller's JSON envelope."""
+
+    def __init__(self, error_code: int, msg: str):
+        super().__init__(msg)
+        self.error_code = error_code
+        self.msg = msg
+
+
+class FakeOmadaController:
+    """
+    A local stand-in for an Omada controller, for tests and benchmarks.
+
+    Implements enough of the controller's API for OmadaClient: controller info, login sessions (cookie and
+    CSRF token), sites, paged clients, devices, switch, access point and gateway details, switch ports,
+    port profiles and LAN settings. Updates are applied to the fake site state, so they can be read back.
+
+        async with FakeOmadaController([SiteSpec(switches=50, access_points=400, clients=20000)]) as controller:
+            async with OmadaClient(controller.url, controller.username, controller.password) as client:
+                ...
+    """
+
+    def __init__(
+        self,
+        sites: list[SiteSpec] | None = None,
+        username: str = "admin",
+        password: str = "password",
+        controller_version: str = "5.15.20",
+        controller_name: str = "Fake Omada Controller",
+        max_page_size: int = 1000,
+        latency: float = 0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.username = username
+        self.password = password
+        self.controller_version = controller_version
+        self.controller_name = controller_name
+        self.controller_id = secrets.token_hex(16)
+        # The controller silently caps page sizes
+        self.max_page_size = max_page_size
+        # Simulated processing time for each request, in seconds
+        self.latency = latency
+        self.sites: dict[str, FakeSite] = {}
+        for index, spec in enumerate(sites or [SiteSpec()]):
+            site = generate_site(spec, index)
+            self.sites[site.site_id] = site
+        # Requests handled, by method and normalized endpoint, such as 'GET switches/{mac}'
+        self.request_counts: dict[str, int] = {}
+        self._host = host
+        self._port = port
+        self._sessions: dict[str, str] = {}
+        # HTTP status to fail with, and the "METHOD endpoint" to fail, or None for any request
+        self._failures: list[tuple[int, str | None]] = []
+        self._runner: web.AppRunner | None = None
+        self._url: str | None = None
+        self._routes: list[tuple[str, re.Pattern, _SiteHandler]] = [
+            ("GET", re.compile(r"^devices$"), self._get_devices),
+            ("GET", re.compile(r"^devices/(?P<mac>[^/]+)/firmware$"), self._get_firmware),
+            ("GET", re.compile(r"^switches/(?P<mac>[^/]+)$"), self._get_switch),
+            ("PATCH", re.compile(r"^switches/(?P<mac>[^/]+)$"), self._patch_switch),
+            ("GET", re.compile(r"^switches/(?P<mac>[^/]+)/ports$"), self._get_switch_ports),
+            ("GET", re.compile(r"^switches/(?P<mac>[^/]+)/ports/(?P<port>\d+)$"), self._get_switch_port),
+            ("PATCH", re.compile(r"^switches/(?P<mac>[^/]+)/ports/(?P<port>\d+)$"), self._patch_switch_port),
+            ("GET", re.compile(r"^eaps/(?P<mac>[^/]+)$"), self._get_access_point),
+            ("PATCH", re.compile(r"^eaps/(?P<mac>[^/]+)$"), self._patch_access_point),
+            ("GET", re.compile(r"^gateways/(?P<mac>[^/]+)$"), self._get_gateway),
+            ("PATCH", re.compile(r"^gateways/(?P<mac>[^/]+)$"), self._patch_gateway),
+            ("GET", re.compile(r"^clients$"), self._get_clients),
+            ("GET", re.compile(r"^insight/clients$"), self._get_known_clients),
+            ("GET", re.compile(r"^clients/(?P<mac>[^/]+)$"), self._get_client),
+            ("PATCH", re.compile(r"^clients/(?P<mac>[^/]+)$"), self._patch_client),
+            ("POST", re.compile(r"^cmd/clients/(?P<mac>[^/]+)/(?P<action>block|unblock|reconnect)$"),
+             self._client_command),
+            ("GET", re.compile(r"^setting/lan/profileSummary$"), self._get_port_profiles),
+            ("GET", re.compile(r"^setting/lan/networks$"), self._get_networks),
+            ("GET", re.compile(r"^setting/wanlanstatus$"), self._get_wan_lan_status),
+        ]
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args) -> bool:
+        await self.stop()
+        return False
+
+    @property
+    def url(self) -> str:
+        """The base url of the running controller."""
+        if self._url is None:
+            raise RuntimeError("The fake controller has not been started")
+        return self._url
+
+    @property
+    def total_requests(self) -> int:
+        """The number of requests handled."""
+        return sum(self.request_counts.values())
+
+    def site(self, name: str = "Default") -> FakeSite:
+        """Get a site's state by name."""
+        return next(s for s in self.sites.values() if s.name == name)
+
+    def expire_sessions(self) -> None:
+        """End all login sessions, as if they had timed out."""
+        self._sessions.clear()
+
+    def fail_requests(self, count: int, status: int = 503, endpoint: str | None = None) -> None:
+        """
+        Make the next `count` API requests fail with an HTTP error status.
+
+        If `endpoint` is given, such as "PATCH switches/{mac}/ports/{n}", only requests to it fail.
+        """
+        self._failures.extend([(status, endpoint)] * count)
+
+    def reset_counts(self) -> None:
+        """Clear the request counts."""
+        self.request_counts.clear()
+
+    async def start(self) -> None:
+        """Start serving."""
+        app = web.Application()
+        app.router.add_route("*", "/{path:.*}", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self._host, self._port)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        self._url = f"http://{host}:{port}"
+
+    async def stop(self) -> None:
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+            self._url = None
+
+    async def _handle(self, request: web.Request) -> web.StreamResponse:
+        key = f"{request.method} {endpoint_template(request.path)}"
+        self.request_counts[key] = self.request_counts.get(key, 0) + 1
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+
+        try:
+            if request.path == "/api/info":
+                return _success(
+                    {"controllerVer": self.controller_version, "omadacId": self.controller_id, "type": 1}
+                )
+
+            match = _API_PATH.match(request.path) or _OPENAPI_PATH.match(request.path)
+            if match is None or match["cid"] != self.controller_id:
+                raise web.HTTPNotFound()
+
+            failure = next((f for f in self._failures if f[1] in (None, key)), None)
+            if failure is not None:
+                self._failures.remove(failure)
+                return web.Response(status=failure[0])
+
+            path = match["path"]
+            if path == "login" and request.method == "POST":
+                return await self._login(request)
+            if path == "loginStatus":
+                return _success({"login": self._session_of(request) is not None})
+
+            if self._session_of(request) is None:
+                raise _ApiError(-1200, "Session timed out. Please log in again.")
+
+            return _success(await self._dispatch(request, path))
+        except _ApiError as err:
+            return web.json_response({"errorCode": err.error_code, "msg": err.msg})
+
+    async def _dispatch(self, request: web.Request, path: str) -> Any:
+        if path == "logout" and request.method == "POST":
+            self._sessions.pop(request.cookies.get(_SESSION_COOKIE, ""), None)
+            return None
+        if path == "users/current" and request.method == "GET":
+            return {
+                "name": self.username,
+                "privilege": {"sites": [{"name": s.name, "key": s.site_id} for s in self.sites.values()]},
+            }
+        if path == "maintenance/uiInterface" and request.method == "GET":
+            return {"controllerName": self.controller_name}
+
+        site_match = _SITE_PATH.match(path)
+        if site_match is None:
+            raise web.HTTPNotFound()
+        site = self.sites.get(site_match["site"])
+        if site is None:
+            raise _ApiError(-1005, "Site not found")
+
+        body = await request.json() if request.can_read_body else None
+        for method, pattern, handler in self._routes:
+            if method == request.method and (route_match := pattern.match(site_match["path"])):
+                return await handler(request, site, route_match, body)
+        raise web.HTTPNotFound()
+
+    async def _login(self, request: web.Request) -> web.Response:
+        credentials = await request.json()
+        if credentials.get("username") != self.username or credentials.get("password") != self.password:
+            raise _ApiError(-30109, "Invalid username or password.")
+        session_id = secrets.token_hex(16)
+        token = secrets.token_hex(16)
+        self._sessions[session_id] = token
+        response = _success({"roleType": 0, "token": token})
+        response.set_cookie(_SESSION_COOKIE, session_id, path="/", httponly=True)
+        return response
+
+    def _session_of(self, request: web.Request) -> str | None:
+        """The session id of a request, if it has a live session and the right CSRF token."""
+        session_id = request.cookies.get(_SESSION_COOKIE)
+        if session_id is None or session_id not in self._sessions:
+            return None
+        if request.headers.get("Csrf-Token") != self._sessions[session_id]:
+            return None
+        return session_id
+
+    async def _get_devices(self, _: web.Request, site: FakeSite, __: re.Match, ___: Any) -> Any:
+        return list(site.devices.values())
+
+    async def _get_firmware(self, _: web.Request, site: FakeSite, match: re.Match, __: Any) -> Any:
+        device = _lookup(site.devices, match["mac"])
+        version = device["firmwareVersion"]
+        return {"curFwVer": version, "lastFwVer": version, "fwReleaseLog": ""}
+
+    async def _get_switch(self, _: web.Request, site: FakeSite, match: re.Match, __: Any) -> Any:
+        _lookup(site.switches, match["mac"])
+        return site.switch_detail(match["mac"])
+
+    async def _patch_switch(self, _: web.Request, site: FakeSite, match: re.Match, body: Any) -> Any:
+        _update_device(site, site.switches, match["mac"], body)
+        return site.switch_detail(match["mac"])
+
+    async def _get_switch_ports(self, _: web.Request, site: FakeSite, match: re.Match, __: Any) -> Any:
+        _lookup(site.switches, match["mac"])
+        return [port for _, port in sorted(site.switch_ports[match["mac"]].items())]
+
+    async def _get_switch_port(self, _: web.Request, site: FakeSite, match: re.Match, __: Any) -> Any:
+        _lookup(site.switches, match["mac"])
+        return _lookup(site.switch_ports[match["mac"]], int(match["port"]))
+
+    async def _patch_switch_port(self, _: web.Request, site: FakeSite, match: re.Match, body: Any) -> Any:
+        _lookup(site.switches, match["mac"])
+        port = _lookup(site.switch_ports[match["mac"]], int(match["port"]))
+        if "profileId" in body:
+            profile = next((p for p in site.port_profiles if p["id"] == body["profileId"]), None)
+            if profile is None:
+                raise _ApiError(-33000, "Port profile does not exist")
+            port["profileName"] = profile["name"]
+        port.update(body)
+        return None
+
+    async def _get_access_point(self, _: web.Request, site: FakeSite, match: re.Match, __: Any) -> Any:
+        return _lookup(site.access_points, match["mac"])
+
+    async def _patch_access_point(self, _: web.Request, site: FakeSite, match: re.Match, body: Any) -> Any:
+        access_point = _lookup(site.access_points, match["mac"])
+        body = dict(body)
+        for change in body.pop("lanPortSettings", []):
+            port = next((p for p in access_point["lanPortSettings"] if p["lanPort"] == change["lanPort"]), None)
+            if port is None:
+                raise _ApiError(-39000, f"Port {change['lanPort']} does not exist")
+            port.update(change)
+        _update_device(site, site.access_points, match["mac"], body)
+        return access_point
+
+    async def _get_gateway(self, _: web.Request, site: FakeSite, match: re.Match, __: Any) -> Any:
+        return _lookup(site.gateways, match["mac"])
+
+    async def _patch_gateway(self, _: web.Request, site: FakeSite, match: re.Match, body: Any) -> Any:
+        return _update_device(site, site.gateways, match["mac"], body)
+
+    async def _get_clients(self, request: web.Request, site: FakeSite, _: re.Match, __: Any) -> Any:
+        return self._page(request, list(site.clients.values()))
+
+    async def _get_known_clients(self, request: web.Request, site: FakeSite, _: re.Match, __: Any) -> Any:
+        return self._page(request, list(site.known_clients.values()))
+
+    async def _get_client(self, _: web.Request, site: FakeSite, match: re.Match, __: Any) -> Any:
+        return _lookup(site.known_clients, match["mac"])
+
+    async def _patch_client(self, _: web.Request, site: FakeSite, match: re.Match, body: Any) -> Any:
+        client = _lookup(site.known_clients, match["mac"])
+        client.update(body)
+        return client
+
+    async def _client_command(self, _: web.Request, site: FakeSite, match: re.Match, __: Any) -> Any:
+        client = _lookup(site.known_clients, match["mac"])
+        if match["action"] != "reconnect":
+            client["blocked"] = match["action"] == "block"
+        return None
+
+    async def _get_port_profiles(self, _: web.Request, site: FakeSite, __: re.Match, ___: Any) -> Any:
+        return {"data": site.port_profiles}
+
+    async def _get_networks(self, request: web.Request, site: FakeSite, _: re.Match, __: Any) -> Any:
+        return self._page(request, site.networks)
+
+    async def _get_wan_lan_status(self, _: web.Request, site: FakeSite, __: re.Match, ___: Any) -> Any:
+        return site.wan_lan_status
+
+    def _page(self, request: web.Request, rows: list[dict[str, Any]]) -> dict[str, Any]:
+        page = max(1, int(request.query.get("currentPage", 1)))
+        page_size = min(self.max_page_size, max(1, int(request.query.get("currentPageSize", 10))))
+        start = (page - 1) * page_size
+        return {
+            "totalRows": len(rows),
+            "currentPage": page,
+            "currentSize": page_size,
+            "data": rows[start : start + page_size],
+        }
+
+
+def _success(result: Any) -> web.Response:
+    return web.Response(
+        text=json.dumps({"errorCode": 0, "msg": "Success.", "result": result}),
+        content_type="application/json",
+    )
+
+
+def _lookup(entries: dict, key: Any) -> Any:
+    entry = entries.get(key)
+    if entry is None:
+        raise _ApiError(-1001, "Invalid request parameters.")
+    return entry
+
+
+def _update_device(site: FakeSite, details: dict[str, dict[str, Any]], mac: str, body: Any) -> dict[str, Any]:
+    """Apply a device PATCH, keeping the device list entry in step."""
+    device = _lookup(details, mac)
+    device.update(body)
+    entry = site.devices[mac]
+    for key in ("name", "ledSetting"):
+        if key in body:
+            entry[key] = body[key]
+    return device
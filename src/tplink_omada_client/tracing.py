@@ -0,0 +1,113 @@
+"""Optional OpenTelemetry tracing of client operations and the requests they make."""
+
+import functools
+import inspect
+from typing import Any, AsyncIterator, Callable, TypeVar
+
+from .endpoints import endpoint_template
+from .instrumentation import RequestRecord
+
+try:
+    from opentelemetry import trace
+    from opentelemetry.trace import ProxyTracerProvider, Span, StatusCode
+except ImportError:
+    trace = None
+
+_TRACER_NAME = "tplink_omada_client"
+
+_C = TypeVar("_C", bound=type)
+
+
+def tracing_enabled() -> bool:
+    """True if OpenTelemetry is installed, and a tracer provider has been configured."""
+    # Until an SDK is configured, the global provider is a proxy that only creates non-recording spans
+    return trace is not None and not isinstance(
+        trace.get_tracer_provider(), ProxyTracerProvider
+    )
+
+
+def traced(cls: _C) -> _C:
+    """Class decorator that opens a span for each call to a public async method, when tracing is enabled."""
+    if trace is None:
+        return cls
+    for name, member in list(vars(cls).items()):
+        if name.startswith("_"):
+            continue
+        span_name = f"{cls.__name__}.{name}"
+        if inspect.iscoroutinefunction(member):
+            setattr(cls, name, _trace_coroutine(span_name, member))
+        elif inspect.isasyncgenfunction(member):
+            setattr(cls, name, _trace_async_generator(span_name, member))
+    return cls
+
+
+def start_request_span(method: str, url: str, attempt: int) -> "Span | None":
+    """Start a span for an HTTP request, as a child of the current span. None if tracing is off."""
+    if not tracing_enabled():
+        return None
+    endpoint = endpoint_template(url)
+    return trace.get_tracer(_TRACER_NAME).start_span(
+        f"{method.upper()} {endpoint}",
+        kind=trace.SpanKind.CLIENT,
+        attributes={
+            "http.request.method": method.upper(),
+            "omada.endpoint": endpoint,
+            "omada.retry.attempt": attempt,
+        },
+    )
+
+
+def end_request_span(span: "Span", record: RequestRecord) -> None:
+    """End an HTTP request span, with the measurements of the request."""
+    if record.status is not None:
+        span.set_attribute("http.response.status_code", record.status)
+    span.set_attribute("omada.request.bytes_sent", record.bytes_sent)
+    span.set_attribute("omada.request.bytes_received", record.bytes_received)
+    if record.error is not None:
+        span.set_attribute("error.type", record.error)
+        span.set_status(StatusCode.ERROR)
+    span.end()
+
+
+def _trace_coroutine(span_name: str, func: Callable[..., Any]) -> Callable[..., Any]:
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        if not tracing_enabled():
+            return await func(*args, **kwargs)
+        with trace.get_tracer(_TRACER_NAME).start_as_current_span(span_name):
+            return await func(*args, **kwargs)
+
+    return wrapper
+
+
+def _trace_async_generator(
+    span_name: str, func: Callable[..., AsyncIterator[Any]]
+) -> Callable[..., AsyncIterator[Any]]:
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        if not tracing_enabled():
+            iterator = func(*args, **kwargs)
+            try:
+                async for item in iterator:
+                    yield item
+            finally:
+                # Close the inner generator as soon as we are closed, rather than leaving it to the GC
+                await iterator.aclose()
+            return
+
+        span = trace.get_tracer(_TRACER_NAME).start_span(span_name)
+        iterator = func(*args, **kwargs)
+        try:
+            while True:
+                # The span can't stay current across a yield, so only make it current while fetching each item
+                with trace.use_span(span, end_on_exit=False):
+                    try:
+                        item = await anext(iterator)
+                    except StopAsyncIteration:
+                        break
+                yield item
+        finally:
+            await iterator.aclose()
+            span.end()
+
+    return wrapper
@@ -0,0 +1,32 @@
+"""Fixtures for testing against a fake Omada controller."""
+
+from typing import AsyncIterator
+
+import pytest
+
+from tplink_omada_client import OmadaClient, OmadaSiteClient
+from tplink_omada_client.testing import FakeOmadaController, SiteSpec
+
+
+@pytest.fixture
+async def controller() -> AsyncIterator[FakeOmadaController]:
+    """A small fake controller, with a single site."""
+    spec = SiteSpec(switches=2, access_points=4, clients=20, disconnected_clients=0, ports_per_switch=8)
+    async with FakeOmadaController([spec]) as fake:
+        yield fake
+
+
+@pytest.fixture
+async def client(controller: FakeOmadaController) -> AsyncIterator[OmadaClient]:
+    """A client logged in to the fake controller."""
+    async with OmadaClient(controller.url, controller.username, controller.password) as omada:
+        await omada.login()
+        yield omada
+
+
+@pytest.fixture
+async def site_client(client: OmadaClient, controller: FakeOmadaController) -> OmadaSiteClient:
+    """A client for the fake controller's site, with the request counts cleared."""
+    site_client = await client.get_site_client("Default")
+    controller.reset_counts()
+    return site_client
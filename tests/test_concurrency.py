@@ -0,0 +1,213 @@
+"""Tests of concurrent paging, the concurrency limiter and request hedging."""
+
+import asyncio
+from contextlib import aclosing
+
+import pytest
+
+from tplink_omada_client import AdaptiveConcurrencyLimiter, OmadaClient, RequestHedger, deadline
+from tplink_omada_client.exceptions import ConnectionFailed, DeadlineExceeded
+from tplink_omada_client.testing import FakeOmadaController, SiteSpec
+
+
+async def _hold_slots(limiter: AdaptiveConcurrencyLimiter, count: int, latency: float, endpoint: str = "devices"):
+    async def request():
+        async with limiter.slot(endpoint):
+            await asyncio.sleep(latency)
+
+    await asyncio.gather(*(request() for _ in range(count)))
+
+
+@pytest.fixture
+async def large_site_client():
+    """A client for a site with enough clients to need many pages."""
+    spec = SiteSpec(switches=1, access_points=2, clients=250, disconnected_clients=0)
+    async with FakeOmadaController([spec]) as controller:
+        async with OmadaClient(controller.url, controller.username, controller.password) as client:
+            yield controller, await client.get_site_client("Default")
+
+
+async def _client_macs(site_client, **kwargs) -> list[str]:
+    return [c.mac async for c in site_client.get_connected_clients(page_size=20, **kwargs)]
+
+
+async def test_concurrent_paging_keeps_page_order(large_site_client):
+    _, site_client = large_site_client
+
+    sequential = await _client_macs(site_client)
+    concurrent = await _client_macs(site_client, concurrency=4)
+
+    assert len(sequential) == 250
+    assert concurrent == sequential
+
+
+async def test_unordered_paging_yields_every_client(large_site_client):
+    _, site_client = large_site_client
+    api = site_client._api  # pylint: disable=protected-access
+    url = api.format_url("clients", site_client._site_id)  # pylint: disable=protected-access
+
+    unordered = [c["mac"] async for c in api.iterate_pages(url, page_size=20, concurrency=4, ordered=False)]
+
+    assert sorted(unordered) == sorted(await _client_macs(site_client))
+
+
+async def test_later_pages_load_while_first_is_consumed(large_site_client):
+    controller, site_client = large_site_client
+    controller.latency = 0.05
+    controller.reset_counts()
+
+    async with aclosing(site_client.get_connected_clients(page_size=20, concurrency=2)) as clients:
+        await anext(clients)
+        # Let the requests for pages 2 and 3 reach the controller, then stop
+        await asyncio.sleep(0.02)
+        assert controller.request_counts["GET clients"] == 3
+
+    await asyncio.sleep(0.1)
+    # None of the 10 remaining pages were requested
+    assert controller.request_counts["GET clients"] == 3
+    assert not [t for t in asyncio.all_tasks() if "fetch_page" in repr(t)]
+
+
+async def test_limiter_caps_requests_in_flight():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, min_limit=2, max_limit=2)
+    in_flight = 0
+    peak = 0
+
+    async def request():
+        nonlocal in_flight, peak
+        async with limiter.slot():
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+
+    await asyncio.gather(*(request() for _ in range(10)))
+
+    assert peak == 2
+
+
+async def test_limiter_grows_while_constraining_requests():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=8)
+
+    await _hold_slots(limiter, 40, 0.01)
+
+    assert limiter.limit > 2
+    assert limiter.baseline_latency("devices") == pytest.approx(0.01, abs=0.01)
+
+
+async def test_limiter_shrinks_when_controller_is_overloaded():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=8)
+
+    with pytest.raises(ConnectionFailed):
+        async with limiter.slot():
+            raise ConnectionFailed("Connection reset")
+    assert limiter.limit == 5
+
+    # Latency rising well above the baseline also counts as overload
+    await _hold_slots(limiter, 1, 0.005)
+    await _hold_slots(limiter, 1, 0.05)
+    assert limiter.limit == 3
+
+
+async def test_limiter_keeps_baseline_for_each_endpoint():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4)
+
+    # A slow endpoint isn't mistaken for overload, just because a fast one was seen first
+    for _ in range(3):
+        await _hold_slots(limiter, 4, 0.002, "eaps/{mac}")
+        await _hold_slots(limiter, 4, 0.05, "clients")
+
+    assert limiter.limit >= 4
+    assert limiter.baseline_latency("eaps/{mac}") < limiter.baseline_latency("clients")
+
+
+async def test_limiter_ignores_expired_deadlines():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=8)
+    async with FakeOmadaController(latency=0.05) as controller:
+        async with OmadaClient(
+            controller.url, controller.username, controller.password, concurrency_limiter=limiter
+        ) as client:
+            site_client = await client.get_site_client("Default")
+            limit = limiter.limit
+
+            for _ in range(3):
+                with pytest.raises(DeadlineExceeded):
+                    async with deadline(0.01):
+                        await site_client.get_devices()
+
+    assert limiter.limit == limit
+
+
+async def test_limiter_waiter_cancelled_as_slot_is_released():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1, min_limit=1, max_limit=1)
+    release = asyncio.Event()
+
+    async def hold():
+        async with limiter.slot():
+            await release.wait()
+
+    async def wait():
+        async with limiter.slot():
+            pass
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(wait())
+    await asyncio.sleep(0)
+
+    # The waiter is cancelled in the same loop iteration as the slot is handed over
+    release.set()
+    waiter.cancel()
+    await holder
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    # The slot wasn't lost
+    await asyncio.wait_for(wait(), 1)
+
+
+async def test_hedges_are_capped():
+    hedger = RequestHedger(percentile=0.5, max_hedge_ratio=0.1, min_samples=5)
+
+    async def fast():
+        return "fast"
+
+    async def slow():
+        await asyncio.sleep(0.02)
+        return "slow"
+
+    for _ in range(10):
+        await hedger.run("devices", fast)
+    for _ in range(20):
+        await hedger.run("devices", slow)
+
+    assert 0 < hedger.hedges <= 0.1 * hedger.requests
+
+
+async def test_hedge_wins_and_slow_request_is_cancelled():
+    hedger = RequestHedger(percentile=0.5, max_hedge_ratio=1, min_samples=5)
+
+    async def fast():
+        return "fast"
+
+    for _ in range(5):
+        await hedger.run("devices", fast)
+
+    calls = 0
+    slow_cancelled = False
+
+    async def send():
+        nonlocal calls, slow_cancelled
+        calls += 1
+        if calls > 1:
+            return "hedge"
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            slow_cancelled = True
+            raise
+        return "slow"
+
+    assert await asyncio.wait_for(hedger.run("devices", send), 1) == "hedge"
+    assert hedger.hedges == 1
+    assert slow_cancelled
@@ -0,0 +1,447 @@
+"""Tests of login sessions, retries, timeouts and request sharing, against a fake controller."""
+
+import asyncio
+import logging
+
+from aiohttp import ClientSession, CookieJar
+import pytest
+
+from tplink_omada_client import (
+    CircuitBreaker,
+    CircuitState,
+    OmadaClient,
+    OmadaResponseCache,
+    OmadaSite,
+    RequestInstrumentation,
+    RequestTimeouts,
+    RetryPolicy,
+    SwitchPortSettings,
+    call_budget,
+    deadline,
+)
+from tplink_omada_client.exceptions import (
+    ControllerUnavailable,
+    DeadlineExceeded,
+    RequestFailed,
+    RequestTimeout,
+    is_transient_error,
+)
+from tplink_omada_client.omadaapiconnection import OmadaApiConnection
+from tplink_omada_client.testing import FakeOmadaController
+
+
+def _connect(controller: FakeOmadaController, **kwargs) -> OmadaClient:
+    return OmadaClient(controller.url, controller.username, controller.password, **kwargs)
+
+
+async def _first_switch(site_client):
+    return next(d for d in await site_client.get_devices() if d.type == "switch")
+
+
+async def test_concurrent_requests_share_one_login(controller: FakeOmadaController):
+    async with _connect(controller) as client:
+        # Identify the site directly, so that nothing has logged in yet
+        site = controller.site()
+        site_client = await client.get_site_client(OmadaSite(site.name, site.site_id))
+
+        await asyncio.gather(*(site_client.get_devices() for _ in range(10)))
+
+        # Only the first request logs in, and the rest wait for it
+        assert controller.request_counts["POST login"] == 1
+
+
+async def test_concurrent_requests_share_one_login_after_expiry(controller, site_client):
+    controller.expire_sessions()
+
+    await asyncio.gather(*(site_client.get_devices() for _ in range(10)))
+
+    assert controller.request_counts["POST login"] == 1
+    # Every request was rejected once, then replayed
+    assert controller.request_counts["GET devices"] == 20
+
+
+async def test_expired_session_is_replayed_once(controller: FakeOmadaController):
+    instrumentation = RequestInstrumentation()
+    async with _connect(controller, instrumentation=instrumentation) as client:
+        site_client = await client.get_site_client("Default")
+        controller.reset_counts()
+        controller.expire_sessions()
+
+        devices = await site_client.get_devices()
+
+    assert len(devices) == len(controller.site().devices)
+    assert controller.request_counts["GET devices"] == 2
+    assert controller.request_counts["POST login"] == 1
+    assert instrumentation.event_counts["session_expired"] == 1
+
+
+async def test_close_stops_keepalive_during_refresh():
+    async with FakeOmadaController(latency=0.2) as controller:
+        api = OmadaApiConnection(controller.url, controller.username, controller.password, keepalive=True)
+        # Refresh soon after logging in, so that close() lands while the refresh is in flight
+        api._session_lifetime = 0.6  # pylint: disable=protected-access
+        await api.login()
+        await asyncio.sleep(0.4)
+        await api.close()
+        await asyncio.sleep(0.5)
+
+        pending = [t for t in asyncio.all_tasks() if "_keep_session_alive" in repr(t)]
+        assert not pending
+        assert controller.request_counts.get("POST login") == 1
+
+
+async def test_keepalive_refreshes_idle_session():
+    async with FakeOmadaController() as controller:
+        api = OmadaApiConnection(controller.url, controller.username, controller.password, keepalive=True)
+        api._session_lifetime = 0.2  # pylint: disable=protected-access
+        await api.login()
+        await asyncio.sleep(0.15)
+        await api.close()
+
+    # The session was checked, which keeps it alive, rather than logging in again
+    assert controller.request_counts["GET loginStatus"] == 1
+    assert controller.request_counts["POST login"] == 1
+
+
+async def test_keepalive_survives_unexpected_errors(caplog: pytest.LogCaptureFixture):
+    async with FakeOmadaController() as controller:
+        api = OmadaApiConnection(controller.url, controller.username, controller.password, keepalive=True)
+        api._session_lifetime = 0.1  # pylint: disable=protected-access
+        refresh_session = api._refresh_session  # pylint: disable=protected-access
+        calls = 0
+
+        async def broken_once():
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise KeyError("login")
+            return await refresh_session()
+
+        api._refresh_session = broken_once  # pylint: disable=protected-access
+        with caplog.at_level(logging.ERROR, "tplink_omada_client.omadaapiconnection"):
+            await api.login()
+            await asyncio.sleep(0.2)
+            assert not api._keepalive_task.done()  # pylint: disable=protected-access
+            await api.close()
+
+    assert controller.request_counts["GET loginStatus"] >= 1
+    assert "Unexpected error refreshing the login session" in caplog.messages
+
+
+async def test_session_lifetime_recovers(controller: FakeOmadaController):
+    async with OmadaApiConnection(controller.url, controller.username, controller.password) as api:
+        # As if an earlier session had expired early, say because the controller restarted
+        api._session_lifetime = 60  # pylint: disable=protected-access
+        api._last_activity -= 600  # pylint: disable=protected-access
+
+        await api.request("get", api.format_url("devices", controller.site().site_id))
+
+        # The session outlasted what we expected, so expect it to last that long in future
+        assert api._session_lifetime >= 600  # pylint: disable=protected-access
+
+
+async def test_exit_with_supplied_session_stops_keepalive(controller: FakeOmadaController):
+    async with ClientSession(cookie_jar=CookieJar(unsafe=True)) as websession:
+        api = OmadaApiConnection(
+            controller.url, controller.username, controller.password, websession=websession, keepalive=True
+        )
+        async with api:
+            site_id = controller.site().site_id
+        controller.expire_sessions()
+
+        # Logging in again to replay the request mustn't start another keepalive task
+        await api.request("get", api.format_url("devices", site_id))
+        assert api._keepalive_task is None  # pylint: disable=protected-access
+
+
+async def test_identical_gets_are_deduplicated(controller: FakeOmadaController):
+    async with _connect(controller, deduplicate_requests=True) as client:
+        site_client = await client.get_site_client("Default")
+        controller.reset_counts()
+        controller.latency = 0.05
+
+        results = await asyncio.gather(*(site_client.get_devices() for _ in range(5)))
+
+    assert controller.request_counts["GET devices"] == 1
+    assert all(len(r) == len(results[0]) for r in results)
+
+
+async def test_get_after_write_does_not_join_earlier_get(controller: FakeOmadaController):
+    async with _connect(controller, deduplicate_requests=True) as client:
+        site_client = await client.get_site_client("Default")
+        switch = await _first_switch(site_client)
+        port_url = site_client._api.format_url(  # pylint: disable=protected-access
+            f"switches/{switch.mac}/ports/5", controller.site().site_id
+        )
+
+        controller.latency = 0.3
+        earlier = asyncio.create_task(site_client.get_switch_port(switch, 5))
+        await asyncio.sleep(0.05)
+        controller.reset_counts()
+        controller.latency = 0
+        await site_client._api.request("patch", port_url, json={"name": "Camera"})  # pylint: disable=protected-access
+        later = await site_client.get_switch_port(switch, 5)
+        await earlier
+
+    assert controller.request_counts["GET switches/{mac}/ports/{n}"] == 1
+    assert later.name == "Camera"
+
+
+async def test_cache_is_invalidated_by_update(controller: FakeOmadaController):
+    async with _connect(controller, cache=OmadaResponseCache()) as client:
+        site_client = await client.get_site_client("Default")
+        switch = await _first_switch(site_client)
+        await site_client.get_switch_port(switch, 5)
+        controller.reset_counts()
+
+        await site_client.get_switch_port(switch, 5)
+        assert "GET switches/{mac}/ports/{n}" not in controller.request_counts
+
+        await site_client.update_switch_port(switch, 5, SwitchPortSettings(name="Camera"))
+        port = await site_client.get_switch_port(switch, 5)
+
+    assert port.name == "Camera"
+
+
+async def test_transient_failures_are_retried(controller: FakeOmadaController):
+    instrumentation = RequestInstrumentation()
+    policy = RetryPolicy(max_attempts=3, backoff_base=0.01)
+    async with _connect(controller, retry_policy=policy, instrumentation=instrumentation) as client:
+        site_client = await client.get_site_client("Default")
+        controller.reset_counts()
+        controller.fail_requests(2, 503)
+
+        await site_client.get_devices()
+
+    assert controller.request_counts["GET devices"] == 3
+    assert instrumentation.event_counts["retry"] == 2
+
+
+async def test_retries_stop_after_max_attempts(controller: FakeOmadaController):
+    policy = RetryPolicy(max_attempts=2, backoff_base=0.01)
+    async with _connect(controller, retry_policy=policy) as client:
+        site_client = await client.get_site_client("Default")
+        controller.reset_counts()
+        controller.fail_requests(3, 503)
+
+        with pytest.raises(RequestFailed):
+            await site_client.get_devices()
+
+    assert controller.request_counts["GET devices"] == 2
+
+
+async def test_retries_stop_when_budget_is_spent(controller: FakeOmadaController):
+    policy = RetryPolicy(max_attempts=5, backoff_base=1, backoff_max=1, total_budget=0)
+    async with _connect(controller, retry_policy=policy) as client:
+        site_client = await client.get_site_client("Default")
+        controller.reset_counts()
+        controller.fail_requests(1, 503)
+
+        with pytest.raises(RequestFailed):
+            await site_client.get_devices()
+
+    assert controller.request_counts["GET devices"] == 1
+
+
+async def test_writes_are_not_retried(controller: FakeOmadaController):
+    policy = RetryPolicy(backoff_base=0.01)
+    async with _connect(controller, retry_policy=policy) as client:
+        site_client = await client.get_site_client("Default")
+        switch = await _first_switch(site_client)
+        port = await site_client.get_switch_port(switch, 5)
+        controller.reset_counts()
+        controller.fail_requests(1, 503)
+
+        with pytest.raises(RequestFailed):
+            await site_client.update_switch_port(switch, port, SwitchPortSettings(name="Camera"))
+
+    assert controller.request_counts["PATCH switches/{mac}/ports/{n}"] == 1
+
+
+async def test_request_timeout(controller: FakeOmadaController):
+    async with _connect(controller, timeouts=RequestTimeouts(default=0.1)) as client:
+        site_client = await client.get_site_client("Default")
+        controller.latency = 0.3
+
+        with pytest.raises(RequestTimeout):
+            await site_client.get_devices()
+
+
+async def test_deadline_limits_whole_operation(site_client, controller: FakeOmadaController):
+    controller.latency = 0.1
+
+    with pytest.raises(DeadlineExceeded) as err:
+        async with deadline(0.25):
+            for _ in range(5):
+                await site_client.get_devices()
+
+    assert not is_transient_error(err.value)
+    assert controller.request_counts["GET devices"] < 5
+
+
+async def test_request_cut_short_by_deadline_is_not_retried(controller: FakeOmadaController):
+    policy = RetryPolicy(max_attempts=3, backoff_base=0.01)
+    async with _connect(controller, retry_policy=policy) as client:
+        site_client = await client.get_site_client("Default")
+        controller.reset_counts()
+        controller.latency = 0.3
+
+        with pytest.raises(DeadlineExceeded):
+            async with deadline(0.1):
+                await site_client.get_devices()
+
+    assert controller.request_counts["GET devices"] == 1
+
+
+async def test_deadline_leaves_other_timeouts_alone():
+    with pytest.raises(TimeoutError) as err:
+        async with deadline(5):
+            raise TimeoutError()
+    assert not isinstance(err.value, DeadlineExceeded)
+
+
+async def test_deadline_only_applies_to_its_caller_of_shared_request(controller: FakeOmadaController):
+    async with _connect(controller, deduplicate_requests=True) as client:
+        site_client = await client.get_site_client("Default")
+        controller.reset_counts()
+        controller.latency = 0.3
+
+        async def with_deadline():
+            async with deadline(0.1):
+                return await site_client.get_devices()
+
+        short, unbounded = await asyncio.gather(
+            with_deadline(), site_client.get_devices(), return_exceptions=True
+        )
+
+    assert isinstance(short, DeadlineExceeded)
+    assert isinstance(unbounded, list)
+    assert controller.request_counts["GET devices"] == 1
+
+
+async def test_circuit_breaker_opens_and_recovers(controller: FakeOmadaController):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.1)
+    changes = []
+    breaker.add_listener(lambda old, new: changes.append(new))
+    async with _connect(controller, circuit_breaker=breaker) as client:
+        site_client = await client.get_site_client("Default")
+        controller.fail_requests(2, 503)
+        for _ in range(2):
+            with pytest.raises(RequestFailed):
+                await site_client.get_devices()
+        assert breaker.state == CircuitState.OPEN
+
+        # Fail fast, without contacting the controller
+        controller.reset_counts()
+        with pytest.raises(ControllerUnavailable):
+            await site_client.get_devices()
+        assert controller.total_requests == 0
+
+        # Once the reset timeout passes, a probe closes the circuit again
+        await asyncio.sleep(0.15)
+        await site_client.get_devices()
+
+    assert breaker.state == CircuitState.CLOSED
+    assert changes == [CircuitState.OPEN, CircuitState.HALF_OPEN, CircuitState.CLOSED]
+
+
+async def test_expired_deadlines_do_not_open_circuit(controller: FakeOmadaController):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+    changes = []
+    breaker.add_listener(lambda old, new: changes.append(new))
+    async with _connect(controller, circuit_breaker=breaker) as client:
+        site_client = await client.get_site_client("Default")
+        controller.latency = 0.05
+
+        for _ in range(3):
+            with pytest.raises(DeadlineExceeded):
+                async with deadline(0.01):
+                    await site_client.get_devices()
+
+        assert breaker.state == CircuitState.CLOSED
+        assert await site_client.get_devices()
+
+    assert not changes
+
+
+async def test_probe_cut_short_by_deadline_is_not_a_failure(controller: FakeOmadaController):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.2)
+    async with _connect(controller, circuit_breaker=breaker) as client:
+        site_client = await client.get_site_client("Default")
+        controller.fail_requests(1, 503)
+        with pytest.raises(RequestFailed):
+            await site_client.get_devices()
+        await asyncio.sleep(0.25)
+
+        controller.latency = 0.1
+        with pytest.raises(DeadlineExceeded):
+            async with deadline(0.03):
+                await site_client.get_devices()
+
+        # The next request probes straight away, rather than waiting for another reset timeout
+        controller.latency = 0
+        assert await site_client.get_devices()
+        assert breaker.state == CircuitState.CLOSED
+
+
+async def test_cancelled_probe_is_not_a_failure():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+
+    async def fail():
+        raise RequestFailed(503, "Unavailable")
+
+    async def succeed():
+        return True
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    with pytest.raises(RequestFailed):
+        await breaker.call(fail, succeed)
+    await asyncio.sleep(0.1)
+
+    probing = asyncio.create_task(breaker.call(succeed, hang))
+    await asyncio.sleep(0.01)
+    assert breaker.state == CircuitState.HALF_OPEN
+    probing.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probing
+
+    # The next request probes straight away, rather than waiting for another reset timeout
+    assert breaker.state == CircuitState.OPEN
+    assert await breaker.call(succeed, succeed)
+    assert breaker.state == CircuitState.CLOSED
+
+
+async def test_call_budget_counts_requests(site_client, controller: FakeOmadaController):
+    async with call_budget() as outer:
+        await site_client.get_devices()
+        async with call_budget() as inner:
+            await site_client.get_port_profiles()
+
+    assert inner.requests == 1
+    assert inner.endpoints == ["GET setting/lan/profileSummary"]
+    assert outer.requests == 2
+    assert outer.requests == controller.total_requests
+    assert outer.bytes_received > 0
+
+
+@pytest.mark.parametrize("optimistic_login", [False, True])
+async def test_optimistic_login_skips_session_check(controller: FakeOmadaController, optimistic_login: bool):
+    async with _connect(controller, optimistic_login=optimistic_login) as client:
+        site_client = await client.get_site_client("Default")
+        # Old enough that the session would normally be checked before the next request
+        client._api._last_logon -= 7200  # pylint: disable=protected-access
+        controller.reset_counts()
+        controller.expire_sessions()
+
+        await site_client.get_devices()
+
+    if optimistic_login:
+        # The request is sent straight away, and replayed after logging in again
+        assert "GET loginStatus" not in controller.request_counts
+        assert controller.request_counts["GET devices"] == 2
+    else:
+        assert controller.request_counts["GET loginStatus"] == 1
+        assert controller.request_counts["GET devices"] == 1
+    assert controller.request_counts["POST login"] == 1
@@ -0,0 +1,86 @@
+"""Tests of the Prometheus exporter, against a fake controller."""
+
+import logging
+import re
+
+from tplink_omada_client import OmadaClient, RequestInstrumentation
+from tplink_omada_client.exporter import OmadaExporter
+from tplink_omada_client.instrumentation import DEFAULT_LATENCY_BUCKETS
+from tplink_omada_client.testing import FakeOmadaController
+
+_SAMPLE = re.compile(r"^(\w+)(?:\{(.*)\})? (\S+)$")
+_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def _parse(text: str) -> tuple[dict[str, str], list[tuple[str, dict[str, str], float]]]:
+    """Split the exposition format into the type of each family, and the samples."""
+    types = {}
+    samples = []
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            _, _, name, metric_type = line.split(" ")
+            types[name] = metric_type
+        elif not line.startswith("#"):
+            name, labels, value = _SAMPLE.match(line).groups()
+            samples.append((name, dict(_LABEL.findall(labels or "")), float(value)))
+    return types, samples
+
+
+def _values(samples, name: str, **labels: str) -> list[float]:
+    return [value for n, sample_labels, value in samples if n == name and labels.items() <= sample_labels.items()]
+
+
+async def test_render(controller: FakeOmadaController):
+    instrumentation = RequestInstrumentation()
+    async with OmadaClient(
+        controller.url, controller.username, controller.password, instrumentation=instrumentation
+    ) as client:
+        exporter = OmadaExporter(client, instrumentation=instrumentation)
+        await exporter.refresh()
+        types, samples = _parse(exporter.render())
+
+    site = controller.site()
+    assert types["omada_exporter_site_up"] == "gauge"
+    assert types["omada_switch_port_transmit_bytes_total"] == "counter"
+    assert types["omada_client_request_duration_seconds"] == "histogram"
+    assert _values(samples, "omada_exporter_site_up") == [1]
+    assert len(_values(samples, "omada_device_up", site="Default")) == len(site.devices)
+    assert len(_values(samples, "omada_switch_port_link_up", site="Default")) == 2 * 8
+    wireless = sum(_values(samples, "omada_wireless_clients", site="Default"))
+    assert wireless + sum(_values(samples, "omada_wired_clients", site="Default")) == 20
+
+    device = next(iter(site.devices.values()))
+    (labels,) = [labels for name, labels, _ in samples if name == "omada_device_up" and labels["mac"] == device["mac"]]
+    assert labels == {
+        "site": "Default",
+        "mac": device["mac"],
+        "name": device["name"],
+        "type": device["type"],
+        "model": device["model"],
+    }
+
+    # Cumulative buckets for each endpoint, ending with +Inf, which matches the count
+    buckets = [
+        (labels["le"], value)
+        for name, labels, value in samples
+        if name == "omada_client_request_duration_seconds_bucket"
+        and (labels["method"], labels["endpoint"]) == ("GET", "devices")
+    ]
+    assert [le for le, _ in buckets] == [str(b) for b in DEFAULT_LATENCY_BUCKETS] + ["+Inf"]
+    counts = [v for _, v in buckets]
+    assert counts == sorted(counts)
+    assert counts[-1] == _values(
+        samples, "omada_client_request_duration_seconds_count", method="GET", endpoint="devices"
+    )[0]
+
+
+async def test_failed_site_is_reported(controller: FakeOmadaController, caplog):
+    async with OmadaClient(controller.url, controller.username, controller.password) as client:
+        exporter = OmadaExporter(client, sites=["Default", "Nowhere"])
+        with caplog.at_level(logging.WARNING, "tplink_omada_client.exporter"):
+            await exporter.refresh()
+        _, samples = _parse(exporter.render())
+
+    assert _values(samples, "omada_exporter_site_up", site="Default") == [1]
+    assert _values(samples, "omada_exporter_site_up", site="Nowhere") == [0]
+    assert any("Nowhere" in r.getMessage() for r in caplog.records)
@@ -0,0 +1,55 @@
+"""Tests of the fake controller that the other tests and the benchmarks run against."""
+
+import pytest
+
+from tplink_omada_client import OmadaClient, SwitchPortSettings
+from tplink_omada_client.exceptions import LoginFailed, RequestFailed
+from tplink_omada_client.testing import FakeOmadaController, SiteSpec
+
+
+async def test_rejects_bad_credentials(controller: FakeOmadaController):
+    with pytest.raises(LoginFailed):
+        async with OmadaClient(controller.url, controller.username, "wrong") as client:
+            await client.login()
+
+
+async def test_serves_generated_site(site_client, controller: FakeOmadaController):
+    site = controller.site()
+
+    devices = await site_client.get_devices()
+    clients = [c async for c in site_client.get_connected_clients()]
+
+    assert [d.mac for d in devices] == list(site.devices)
+    assert len(clients) == len(site.clients)
+    assert controller.request_counts["GET devices"] == 1
+
+
+async def test_caps_page_size():
+    async with FakeOmadaController([SiteSpec(clients=250, disconnected_clients=0)], max_page_size=100) as controller:
+        async with OmadaClient(controller.url, controller.username, controller.password) as client:
+            site_client = await client.get_site_client("Default")
+            controller.reset_counts()
+
+            clients = [c async for c in site_client.get_connected_clients(page_size=1000)]
+
+    assert len(clients) == 250
+    assert controller.request_counts["GET clients"] == 3
+
+
+async def test_fails_requests_to_one_endpoint(site_client, controller: FakeOmadaController):
+    controller.fail_requests(1, 500, endpoint="GET setting/lan/profileSummary")
+
+    await site_client.get_devices()
+    with pytest.raises(RequestFailed) as err:
+        await site_client.get_port_profiles()
+
+    assert err.value.error_code == 500
+    assert await site_client.get_port_profiles()
+
+
+async def test_patch_updates_state(site_client, controller: FakeOmadaController):
+    switch = next(d for d in await site_client.get_devices() if d.type == "switch")
+
+    await site_client.update_switch_port(switch, 3, SwitchPortSettings(name="Printer"))
+
+    assert controller.site().switch_ports[switch.mac][3]["name"] == "Printer"
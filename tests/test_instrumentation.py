@@ -0,0 +1,72 @@
+"""Tests of request instrumentation, against a fake controller."""
+
+import pytest
+
+from tplink_omada_client import OmadaClient, RequestInstrumentation
+from tplink_omada_client.exceptions import RequestFailed
+from tplink_omada_client.instrumentation import LatencyHistogram, RequestRecord
+from tplink_omada_client.testing import FakeOmadaController
+
+
+def test_histogram_buckets():
+    histogram = LatencyHistogram(buckets=(0.1, 0.5, 1))
+
+    for latency in (0.05, 0.1, 0.3, 0.7, 2):
+        histogram.observe(latency)
+
+    # A latency on a bucket's upper bound falls in that bucket
+    assert histogram.counts == [2, 1, 1, 1]
+    assert histogram.count == 5
+    assert histogram.sum == pytest.approx(3.15)
+    assert histogram.percentile(0.4) == 0.1
+    assert histogram.percentile(0.5) == 0.5
+    assert histogram.percentile(1) == float("inf")
+
+
+def test_empty_histogram_has_no_percentiles():
+    assert LatencyHistogram().percentile(0.5) is None
+
+
+async def test_requests_are_recorded_with_timings(controller: FakeOmadaController):
+    instrumentation = RequestInstrumentation()
+    records: list[RequestRecord] = []
+    instrumentation.subscribe(records.append)
+    # Use a host name, so that it has to be resolved
+    url = controller.url.replace("127.0.0.1", "localhost")
+
+    async with OmadaClient(url, controller.username, controller.password, instrumentation=instrumentation) as client:
+        site_client = await client.get_site_client("Default")
+        controller.latency = 0.05
+        await site_client.get_devices()
+
+    devices = next(r for r in records if r.endpoint == "devices")
+    assert devices.method == "GET"
+    assert devices.status == 200
+    assert devices.bytes_received > 0
+    assert devices.error is None
+    assert 0.05 <= devices.time_to_first_byte <= devices.total_time
+
+    # Only the first request had to look up the host and open a connection
+    first = records[0]
+    assert first.dns_time is not None and first.dns_time >= 0
+    assert first.connect_time is not None and first.connect_time >= 0
+    assert devices.dns_time is None and devices.connect_time is None
+
+    histogram = instrumentation.histograms[("GET", "devices")]
+    assert histogram.count == 1
+    assert histogram.sum == devices.total_time
+    assert not instrumentation.errors
+
+
+async def test_failed_requests_are_counted(controller: FakeOmadaController):
+    instrumentation = RequestInstrumentation()
+    async with OmadaClient(
+        controller.url, controller.username, controller.password, instrumentation=instrumentation
+    ) as client:
+        site_client = await client.get_site_client("Default")
+        controller.fail_requests(1, 500)
+        with pytest.raises(RequestFailed):
+            await site_client.get_devices()
+
+    assert instrumentation.errors == {("GET", "devices"): 1}
+    assert instrumentation.event_counts["login"] == 1
@@ -0,0 +1,76 @@
+"""Tests that the JSON codecs give the same results as the standard library."""
+
+import json
+
+import pytest
+
+from tplink_omada_client import OmadaClient
+from tplink_omada_client.jsoncodec import (
+    JsonCodec,
+    MsgspecCodec,
+    OrjsonCodec,
+    StdlibJsonCodec,
+    default_codec,
+)
+from tplink_omada_client.testing import FakeOmadaController
+
+_SAMPLE = {
+    "errorCode": 0,
+    "msg": "Success.",
+    "result": {
+        "totalRows": 2,
+        "data": [
+            {"mac": "AA-BB-CC-DD-EE-FF", "name": "Kühlschrank ❄", "rssi": -61, "activity": 12.5, "guest": False},
+            {"mac": "11-22-33-44-55-66", "name": None, "trafficDown": 2**53 + 1, "tags": [], "ports": {"1": [1, 2]}},
+        ],
+    },
+}
+
+
+def _codec(codec_type: type) -> JsonCodec:
+    try:
+        return codec_type()
+    except ImportError:
+        pytest.skip(f"{codec_type.__name__} needs a library that isn't installed")
+
+
+@pytest.fixture(params=[StdlibJsonCodec, OrjsonCodec, MsgspecCodec], ids=lambda t: t.__name__)
+def codec(request) -> JsonCodec:
+    """Each of the codecs that is installed."""
+    return _codec(request.param)
+
+
+def test_loads_matches_stdlib(codec: JsonCodec):
+    data = json.dumps(_SAMPLE).encode("utf-8")
+
+    assert codec.loads(data) == json.loads(data)
+
+
+def test_dumps_matches_stdlib(codec: JsonCodec):
+    # Compare decoded values, as whitespace and escaping may legitimately differ
+    assert json.loads(codec.dumps(_SAMPLE)) == json.loads(json.dumps(_SAMPLE))
+
+
+def test_dumps_converts_non_string_keys(codec: JsonCodec):
+    payload = {"portMap": {1: "ETH1", 2: "ETH2"}}
+
+    assert json.loads(codec.dumps(payload)) == json.loads(json.dumps(payload))
+
+
+def test_default_codec_is_usable():
+    codec = default_codec()
+
+    assert codec.loads(codec.dumps(_SAMPLE)) == _SAMPLE
+
+
+async def test_client_results_match_stdlib(codec: JsonCodec, controller: FakeOmadaController):
+    results = []
+    for json_codec in (StdlibJsonCodec(), codec):
+        client = OmadaClient(controller.url, controller.username, controller.password, json_codec=json_codec)
+        async with client:
+            site_client = await client.get_site_client("Default")
+            devices = await site_client.get_devices()
+            clients = [c async for c in site_client.get_connected_clients()]
+            results.append(([d.raw_data for d in devices], [c.raw_data for c in clients]))
+
+    assert results[0] == results[1]
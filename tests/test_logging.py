@@ -0,0 +1,61 @@
+"""Tests of the connection's debug logging, against a fake controller."""
+
+import logging
+
+import pytest
+
+from tplink_omada_client import OmadaClient, OmadaSiteClient, RetryPolicy
+from tplink_omada_client.testing import FakeOmadaController
+
+_LOGGER_NAME = "tplink_omada_client.omadaapiconnection"
+
+
+def _records(caplog: pytest.LogCaptureFixture, field: str) -> list[logging.LogRecord]:
+    return [r for r in caplog.records if r.name == _LOGGER_NAME and hasattr(r, field)]
+
+
+async def test_requests_are_logged(site_client: OmadaSiteClient, caplog: pytest.LogCaptureFixture):
+    with caplog.at_level(logging.DEBUG, _LOGGER_NAME):
+        await site_client.get_devices()
+
+    (record,) = _records(caplog, "omada_method")
+    assert record.levelno == logging.DEBUG
+    assert record.getMessage().startswith("GET devices -> 200 in ")
+    assert record.omada_endpoint == "devices"
+    assert record.omada_status == 200
+    assert record.omada_bytes_received > 0
+    assert record.omada_error is None
+
+
+async def test_pages_are_logged(site_client: OmadaSiteClient, caplog: pytest.LogCaptureFixture):
+    with caplog.at_level(logging.DEBUG, _LOGGER_NAME):
+        clients = [c async for c in site_client.get_connected_clients(page_size=5)]
+
+    pages = _records(caplog, "omada_page")
+    assert [r.omada_page for r in pages] == [1, 2, 3, 4]
+    assert all(r.omada_endpoint == "clients" and r.omada_total_rows == len(clients) for r in pages)
+    assert pages[0].getMessage() == f"Fetched page 1 of clients: 5 rows of {len(clients)}"
+
+
+async def test_connection_events_are_logged(controller: FakeOmadaController, caplog: pytest.LogCaptureFixture):
+    policy = RetryPolicy(max_attempts=2, backoff_base=0.01)
+    with caplog.at_level(logging.DEBUG, _LOGGER_NAME):
+        async with OmadaClient(controller.url, controller.username, controller.password, retry_policy=policy) as client:
+            site_client = await client.get_site_client("Default")
+            controller.fail_requests(1, 503)
+            await site_client.get_devices()
+
+    events = _records(caplog, "omada_event")
+    assert [r.omada_event for r in events] == ["login", "retry"]
+    retry = events[1]
+    assert retry.omada_attempt == 1
+    assert retry.omada_error == "RequestFailed"
+    assert retry.getMessage() == f"Connection event retry attempt=1 delay={retry.omada_delay} error=RequestFailed"
+
+
+async def test_nothing_is_logged_above_debug(site_client: OmadaSiteClient, caplog: pytest.LogCaptureFixture):
+    with caplog.at_level(logging.INFO, _LOGGER_NAME):
+        await site_client.get_devices()
+        _ = [c async for c in site_client.get_connected_clients()]
+
+    assert not [r for r in caplog.records if r.name == _LOGGER_NAME]
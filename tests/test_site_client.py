@@ -0,0 +1,166 @@
+"""Tests of the site client's device lookups and bulk operations, against a fake controller."""
+
+import asyncio
+
+import pytest
+
+from tplink_omada_client import (
+    AccessPointPortSettings,
+    OmadaSiteClient,
+    PortProfileOverrides,
+    SwitchPortSettings,
+)
+from tplink_omada_client.exceptions import (
+    DeviceDetailsFailed,
+    InvalidDevice,
+    PortUpdatesFailed,
+    RequestFailed,
+)
+from tplink_omada_client.testing import FakeOmadaController
+
+
+async def test_get_switches_reports_partial_results(site_client: OmadaSiteClient, controller: FakeOmadaController):
+    site = controller.site()
+    missing_mac = next(iter(site.switches))
+    # The switch is still listed, but its details can't be fetched
+    del site.switches[missing_mac]
+
+    with pytest.raises(DeviceDetailsFailed) as err:
+        await site_client.get_switches()
+
+    assert [s.mac for s in err.value.results] == list(site.switches)
+    assert list(err.value.errors) == [missing_mac]
+    assert isinstance(err.value.errors[missing_mac], RequestFailed)
+
+
+async def test_get_access_points_fetches_details_concurrently(
+    site_client: OmadaSiteClient, controller: FakeOmadaController
+):
+    controller.latency = 0.1
+
+    started = asyncio.get_running_loop().time()
+    access_points = await site_client.get_access_points(concurrency=4)
+    elapsed = asyncio.get_running_loop().time() - started
+
+    assert [a.mac for a in access_points] == list(controller.site().access_points)
+    # The device list, then one round of details, rather than one after another
+    assert elapsed < 0.35
+
+
+async def test_device_registry_lookups(site_client: OmadaSiteClient, controller: FakeOmadaController):
+    device = next(iter(controller.site().devices.values()))
+    mac = device["mac"]
+
+    by_mac = await site_client.get_device(mac)
+    by_lower_mac = await site_client.get_device(mac.lower().replace("-", ":"))
+    by_name = await site_client.find_device(device["name"])
+
+    assert by_mac.mac == by_lower_mac.mac == by_name.mac == mac
+    assert controller.request_counts["GET devices"] == 1
+
+
+async def test_device_registry_refreshes_on_miss(site_client: OmadaSiteClient, controller: FakeOmadaController):
+    await site_client.get_devices()
+
+    with pytest.raises(InvalidDevice):
+        await site_client.find_device("No such device")
+
+    assert controller.request_counts["GET devices"] == 2
+
+
+async def test_device_registry_shares_refresh(site_client: OmadaSiteClient, controller: FakeOmadaController):
+    macs = list(controller.site().devices)
+
+    devices = await asyncio.gather(*(site_client.get_device(mac) for mac in macs))
+
+    assert [d.mac for d in devices] == macs
+    assert controller.request_counts["GET devices"] == 1
+
+
+async def test_port_profiles_are_fetched_once(site_client: OmadaSiteClient, controller: FakeOmadaController):
+    switch = next(d for d in await site_client.get_devices() if d.type == "switch")
+    ports = await site_client.get_switch_ports(switch)
+
+    await asyncio.gather(*(site_client.get_switch_port_overrides(switch, p) for p in ports))
+    profiles = await site_client.get_port_profiles_by_id({p.profile_id for p in ports})
+
+    assert set(profiles) == {p.profile_id for p in ports}
+    assert controller.request_counts["GET setting/lan/profileSummary"] == 1
+
+    site_client.invalidate_port_profiles()
+    await site_client.get_port_profile(ports[0].profile_id)
+    assert controller.request_counts["GET setting/lan/profileSummary"] == 2
+
+
+async def test_update_switch_ports(site_client: OmadaSiteClient, controller: FakeOmadaController):
+    switch = next(d for d in await site_client.get_devices() if d.type == "switch")
+    controller.reset_counts()
+
+    updated = await site_client.update_switch_ports(
+        switch,
+        {
+            port: SwitchPortSettings(
+                name=f"Desk {port}",
+                profile_override_enabled=port % 2 == 0,
+                profile_overrides=PortProfileOverrides(enable_poe=False),
+            )
+            for port in range(1, 9)
+        },
+    )
+
+    assert [p.name for p in updated] == [f"Desk {port}" for port in range(1, 9)]
+    assert controller.request_counts == {
+        "GET switches/{mac}/ports": 2,
+        "GET setting/lan/profileSummary": 1,
+        "PATCH switches/{mac}/ports/{n}": 8,
+    }
+
+
+async def test_update_switch_ports_reports_failures(site_client: OmadaSiteClient, controller: FakeOmadaController):
+    switch = next(d for d in await site_client.get_devices() if d.type == "switch")
+    with pytest.raises(InvalidDevice):
+        await site_client.update_switch_ports(switch, {99: SwitchPortSettings(name="Nowhere")})
+
+    controller.fail_requests(1, 500, endpoint="PATCH switches/{mac}/ports/{n}")
+    with pytest.raises(PortUpdatesFailed) as err:
+        await site_client.update_switch_ports(
+            switch, {1: SwitchPortSettings(name="One"), 3: SwitchPortSettings(name="Three")}, concurrency=1
+        )
+
+    assert [p.port for p in err.value.results] == [3]
+    assert [p.name for p in err.value.results] == ["Three"]
+    assert list(err.value.errors) == [1]
+
+
+async def test_update_access_point_ports(site_client: OmadaSiteClient, controller: FakeOmadaController):
+    access_points = await site_client.get_access_points()
+    port_names = [p.port_name for p in access_points[0].lan_port_settings]
+    controller.reset_counts()
+
+    updated = await site_client.update_access_point_ports(
+        {
+            ap: {name: AccessPointPortSettings(vlan_enable=True, vlan_id=30) for name in port_names}
+            for ap in access_points
+        }
+    )
+
+    assert [a.mac for a in updated] == [a.mac for a in access_points]
+    assert all(p.local_vlan_enable and p.local_vlan_id == 30 for a in updated for p in a.lan_port_settings)
+    # One request for each access point, with no need to fetch them again
+    assert controller.request_counts == {"PATCH eaps/{mac}": len(access_points)}
+
+
+async def test_update_access_point_ports_reports_failures(site_client: OmadaSiteClient):
+    first, second = (await site_client.get_access_points())[:2]
+
+    with pytest.raises(PortUpdatesFailed) as err:
+        await site_client.update_access_point_ports(
+            {
+                first: {"ETH9": AccessPointPortSettings(vlan_id=10)},
+                second.mac: {"ETH1": AccessPointPortSettings(vlan_id=20)},
+            }
+        )
+
+    assert [a.mac for a in err.value.results] == [second.mac]
+    assert list(err.value.errors) == [first.mac]
+    assert isinstance(err.value.errors[first.mac], InvalidDevice)
@@ -0,0 +1,100 @@
+"""Tests of OpenTelemetry tracing, against a fake controller."""
+
+from contextlib import aclosing
+
+import pytest
+
+from tplink_omada_client import OmadaSiteClient
+from tplink_omada_client.exceptions import RequestFailed
+from tplink_omada_client.testing import FakeOmadaController
+from tplink_omada_client.tracing import traced, tracing_enabled
+
+pytest.importorskip("opentelemetry.sdk")
+
+# pylint: disable=wrong-import-position
+from opentelemetry import trace  # noqa: E402
+from opentelemetry.sdk.trace import TracerProvider  # noqa: E402
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor  # noqa: E402
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter  # noqa: E402
+from opentelemetry.trace import SpanKind, StatusCode  # noqa: E402
+
+
+@pytest.fixture
+def spans(monkeypatch) -> InMemorySpanExporter:
+    """Collects the spans that are finished, while a tracer provider is configured."""
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    # The global provider can only be set once, so swap it in just for this test
+    monkeypatch.setattr(trace, "_TRACER_PROVIDER", provider)
+    return exporter
+
+
+def _span(spans: InMemorySpanExporter, name: str):
+    (span,) = [s for s in spans.get_finished_spans() if s.name == name]
+    return span
+
+
+async def test_requests_are_children_of_operation(site_client: OmadaSiteClient, spans: InMemorySpanExporter):
+    assert tracing_enabled()
+
+    await site_client.get_devices()
+
+    operation = _span(spans, "OmadaSiteClient.get_devices")
+    request = _span(spans, "GET devices")
+    assert request.parent.span_id == operation.context.span_id
+    assert request.kind == SpanKind.CLIENT
+    assert request.attributes["http.request.method"] == "GET"
+    assert request.attributes["omada.endpoint"] == "devices"
+    assert request.attributes["omada.retry.attempt"] == 1
+    assert request.attributes["http.response.status_code"] == 200
+    assert request.attributes["omada.request.bytes_received"] > 0
+
+
+async def test_paged_requests_are_children_of_generator(site_client: OmadaSiteClient, spans: InMemorySpanExporter):
+    async with aclosing(site_client.get_connected_clients(page_size=5)) as clients:
+        async for _ in clients:
+            pass
+
+    operation = _span(spans, "OmadaSiteClient.get_connected_clients")
+    requests = [s for s in spans.get_finished_spans() if s.name == "GET clients"]
+    assert len(requests) == 4
+    assert all(r.parent.span_id == operation.context.span_id for r in requests)
+
+
+async def test_failed_request_span(
+    site_client: OmadaSiteClient, controller: FakeOmadaController, spans: InMemorySpanExporter
+):
+    controller.fail_requests(1, 500)
+
+    with pytest.raises(RequestFailed):
+        await site_client.get_devices()
+
+    request = _span(spans, "GET devices")
+    assert request.status.status_code == StatusCode.ERROR
+    assert request.attributes["error.type"] == "RequestFailed"
+    assert request.attributes["http.response.status_code"] == 500
+
+
+async def test_untraced_generator_is_closed():
+    assert not tracing_enabled()
+    closed = False
+
+    @traced
+    class Source:
+        """A traced class."""
+
+        async def items(self):
+            """Items, noting when the generator is closed."""
+            nonlocal closed
+            try:
+                yield 1
+                yield 2
+            finally:
+                closed = True
+
+    async with aclosing(Source().items()) as items:
+        async for _ in items:
+            break
+
+    assert closed